@@ -0,0 +1,23 @@
+"""Offline performance benchmarks.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the
+back-end directory and uses its own throwaway SQLite database.
+"""
+import os
+import tempfile
+
+
+def setup_django():
+    """Configure Django against a fresh SQLite database, migrate it and
+    create the planning cache table."""
+    db_dir = tempfile.mkdtemp(prefix='spotter-bench-')
+    os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+    os.environ['DB_NAME'] = os.path.join(db_dir, 'bench.sqlite3')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spotter_api.settings')
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
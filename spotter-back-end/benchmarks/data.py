@@ -0,0 +1,69 @@
+"""Bulk fixtures for benchmarks: drivers with duty logs and stored trips."""
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+# A typical day: 10 h off, 1 h pre-trip, 11 h driving with a 30 min break.
+DAY = (('OFF', 600), ('ON', 60), ('D', 300), ('OFF', 30), ('D', 360), ('ON', 90))
+
+
+def populate_logs(drivers, days, end, prefix='BENCH'):
+    """Create ``drivers`` drivers with ``days`` days of logs ending at ``end``."""
+    from eld.models import Driver, HOSLog
+
+    created = Driver.objects.bulk_create([
+        Driver(name=f'{prefix} {index}', license_number=f'{prefix}{index}',
+               current_cycle_hours=0)
+        for index in range(drivers)
+    ])
+    if not all(driver.pk for driver in created):
+        created = list(Driver.objects.filter(license_number__startswith=prefix))
+
+    first = end - timedelta(days=days - 1)
+    logs = []
+    for driver in created:
+        for offset in range(days):
+            day = first + timedelta(days=offset)
+            cursor = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc)
+            for status, minutes in DAY:
+                logs.append(HOSLog(driver=driver, date=day, duty_status=status,
+                                   start_time=cursor, duration=minutes))
+                cursor += timedelta(minutes=minutes)
+        if len(logs) >= 20000:
+            HOSLog.objects.bulk_create(logs, batch_size=2000)
+            logs = []
+    HOSLog.objects.bulk_create(logs, batch_size=2000)
+    return created
+
+
+def populate_trips(count):
+    """Create ``count`` stored trips, each with segments, stops and plans."""
+    from trips.models import DailyPlan, FuelStop, RestStop, RouteSegment, Trip
+
+    trips = Trip.objects.bulk_create([
+        Trip(origin=f'Origin {i}', destination=f'Destination {i}',
+             pickup_location=f'Pickup {i}', estimated_duration=2520,
+             total_distance_miles=2800, total_driving_hours=42)
+        for i in range(count)
+    ], batch_size=2000)
+    if not all(trip.pk for trip in trips):
+        trips = list(Trip.objects.order_by('-id')[:count])
+
+    segments, fuel, rest, plans = [], [], [], []
+    for trip in trips:
+        segments += [
+            RouteSegment(trip=trip, start_point=trip.origin, end_point=trip.pickup_location,
+                         distance=25.0, driving_time=30),
+            RouteSegment(trip=trip, start_point=trip.pickup_location,
+                         end_point=trip.destination, distance=4500.0, driving_time=2490),
+        ]
+        fuel += [FuelStop(trip=trip, location=f'Fuel Stop {i}', fuel_amount=200)
+                 for i in (1, 2)]
+        rest += [RestStop(trip=trip, location=f'End of day {i}', duration=600,
+                          reason='10-hour off-duty break') for i in (1, 2, 3)]
+        plans += [DailyPlan(trip=trip, date=datetime(2025, 1, day).date(),
+                            driving_hours=11, on_duty_hours=14, off_duty_hours=10,
+                            status='completed') for day in (1, 2, 3, 4)]
+    for model, rows in ((RouteSegment, segments), (FuelStop, fuel),
+                        (RestStop, rest), (DailyPlan, plans)):
+        model.objects.bulk_create(rows, batch_size=2000)
+    return trips
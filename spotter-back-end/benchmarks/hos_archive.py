@@ -0,0 +1,72 @@
+"""Hot-path HOS validation before and after archiving old logs.
+
+    python -m benchmarks.hos_archive --drivers 50 --days 365
+
+Fills the database with a year of daily duty logs per driver, times
+``validate_hos`` for every driver on the latest day, archives everything
+older than the horizon and times it again.
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from benchmarks import setup_django
+from benchmarks.data import populate_logs
+
+
+def time_validation(drivers, day, repeat):
+    from eld.hos_engine import validate_hos
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for driver in drivers:
+            validate_hos(driver, day)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(drivers)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drivers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from eld.archive import archive_logs_before
+    from eld.models import HOSLog
+
+    end = date.today()
+    drivers = populate_logs(args.drivers, args.days, end)
+    hot_rows_before = HOSLog.objects.count()
+    before_ms = time_validation(drivers, end, args.repeat)
+
+    start = time.perf_counter()
+    archived, archives = archive_logs_before(end - timedelta(days=args.horizon))
+    archive_seconds = time.perf_counter() - start
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+    after_ms = time_validation(drivers, end, args.repeat)
+
+    print(json.dumps({
+        'benchmark': 'hos_archive',
+        'drivers': args.drivers,
+        'days': args.days,
+        'horizon_days': args.horizon,
+        'hot_rows_before': hot_rows_before,
+        'hot_rows_after': HOSLog.objects.count(),
+        'logs_archived': archived,
+        'archives_written': archives,
+        'archive_seconds': round(archive_seconds, 3),
+        'validate_hos_ms_before': round(before_ms, 3),
+        'validate_hos_ms_after': round(after_ms, 3),
+        'speedup': round(before_ms / after_ms, 2) if after_ms else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Cold-start import time of the WSGI app, checked against a budget.
+
+    python -m benchmarks.import_time [--runs 5] [--update-budget]
+
+Starts a fresh interpreter under ``python -X importtime`` that loads the
+WSGI application and URLconf (what a serverless cold start does before
+serving its first request), sums the reported import times and fails when
+the median exceeds ``import_budget.json`` or when a module that should be
+imported lazily shows up. ``eager_modules`` lists known startup imports
+that cannot be deferred; they are reported, not enforced.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / 'import_budget.json'
+
+STARTUP = 'from spotter_api.wsgi import application; import spotter_api.urls'
+
+
+def measure():
+    """Import the app once; return (total import ms, imported module names)."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='spotter_api.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _cumulative, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # column header
+        total_us += int(self_us)
+        modules.add(name.strip())
+    return total_us / 1000, modules
+
+
+def load_budget():
+    with open(BUDGET_FILE) as handle:
+        budget = json.load(handle)
+    if (BACKEND_DIR / '.env').exists():
+        # Settings load python-dotenv only when there is a .env file.
+        budget['lazy_modules'] = [
+            name for name in budget['lazy_modules'] if name != 'dotenv']
+    return budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument(
+        '--update-budget', action='store_true',
+        help="Reset startup_ms to 1.5x the measured median.")
+    args = parser.parse_args()
+
+    budget = load_budget()
+    with open(BUDGET_FILE) as handle:
+        stored = json.load(handle)
+    timings = []
+    modules = set()
+    for _ in range(args.runs):
+        elapsed, modules = measure()
+        timings.append(elapsed)
+    median = statistics.median(timings)
+    eager = sorted(set(budget['lazy_modules']) & modules)
+
+    if args.update_budget:
+        budget['startup_ms'] = stored['startup_ms'] = round(median * 1.5)
+        with open(BUDGET_FILE, 'w') as handle:
+            json.dump(stored, handle, indent=2)
+            handle.write('\n')
+
+    report = {
+        'benchmark': 'import_time',
+        'runs': args.runs,
+        'median_ms': round(median, 1),
+        'min_ms': round(min(timings), 1),
+        'budget_ms': budget['startup_ms'],
+        'eagerly_imported': eager,
+        'known_eager': sorted(set(budget.get('eager_modules', [])) & modules),
+    }
+    print(json.dumps(report, indent=2))
+    if median > budget['startup_ms'] or eager:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""A small closed-loop HTTP load generator.
+
+``concurrency`` threads each issue requests back to back until ``requests``
+have been sent in total; latency is measured per request and reported as
+throughput plus nearest-rank percentiles.
+"""
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil
+    return sorted_values[int(rank) - 1]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round((len(latencies) + errors) / elapsed, 2) if elapsed else None,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'max_ms': _ms(latencies[-1] if latencies else None),
+    }
+
+
+def http_request(url, body=None, timeout=60):
+    """Send one GET (or JSON POST when ``body`` is given); return the status."""
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(
+        url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def http_json(url, timeout=60):
+    """GET ``url`` and return its decoded JSON body."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def run_load(send, requests, concurrency):
+    """Call ``send(i)`` for ``i`` in ``range(requests)`` from ``concurrency``
+    threads. ``send`` returns an HTTP status; 4xx/5xx and exceptions count as
+    errors and are excluded from the latency percentiles."""
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies = []
+    errors = 0
+
+    def worker():
+        nonlocal errors
+        while True:
+            index = next(counter)
+            if index >= requests:
+                return
+            start = time.perf_counter()
+            try:
+                ok = send(index) < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors, time.perf_counter() - start)
@@ -0,0 +1,326 @@
+"""Offline end-to-end benchmark suite.
+
+    python -m benchmarks.suite [--quick] [--out results.json] [--compare old.json]
+
+Runs entirely on localhost: Nominatim and OpenRouteService are replaced by
+the stand-ins in ``benchmarks.upstreams`` and the API is served by a
+threaded WSGI server over a throwaway SQLite database. Measures
+
+* ``plan_trip``: a long multi-leg route with a cold and a warm planning cache,
+* ``validate_hos``: years of logs for thousands of drivers,
+* truck stop lookups along a long route in a large synthetic index,
+* the HTTP endpoints under concurrent load (throughput, p50/p95/p99).
+
+Results are written as JSON (by default to ``benchmarks/results/<sha>.json``)
+together with the commit and interpreter they were taken on, and
+``--compare`` prints the change of every metric against an earlier file.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from pathlib import Path
+
+from benchmarks import setup_django
+from benchmarks.data import populate_logs, populate_trips
+from benchmarks.load import http_json, http_request, run_load
+from benchmarks.upstreams import FakeUpstreams
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+LONG_TRIP = {'origin': 'New York, NY', 'pickup_location': 'Chicago, IL',
+             'destination': 'Los Angeles, CA', 'estimated_duration': 2520}
+
+SIZES = {
+    # name: (full, --quick)
+    'route_points': (20000, 2000),
+    'plan_repeat': (20, 5),
+    'hos_drivers': (2000, 50),
+    'hos_days': (730, 30),
+    'hos_sample': (200, 50),
+    'truck_stops': (200000, 20000),
+    'trips': (20000, 500),
+    'history_depth': (300, 20),
+    'load_requests': (2000, 200),
+    'plan_requests': (200, 40),
+    'concurrency': (16, 4),
+}
+
+
+def git_revision():
+    root = Path(__file__).resolve().parent
+    try:
+        sha = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, check=True,
+                             capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain'], cwd=root, check=True,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return sha, bool(dirty)
+
+
+def bench_plan_trip(upstreams, repeat):
+    from django.core.cache import caches
+
+    from eld.models import Driver
+    from trips.models import Trip
+    from trips.planner import plan_trip
+
+    driver = Driver.objects.create(name='Bench Planner', license_number='BENCHPLAN',
+                                   current_cycle_hours=0)
+    trip = Trip.objects.create(**LONG_TRIP)
+
+    def timed(clear):
+        samples = []
+        for _ in range(repeat):
+            if clear:
+                caches['planning'].clear()
+            start = time.perf_counter()
+            result = plan_trip(driver, trip)
+            samples.append(time.perf_counter() - start)
+            if 'errors' in result:
+                raise RuntimeError(result['errors'])
+        return {'median_ms': round(statistics.median(samples) * 1000, 2),
+                'min_ms': round(min(samples) * 1000, 2)}
+
+    before = dict(upstreams.requests)
+    cold = timed(clear=True)
+    warm = timed(clear=False)
+    result = plan_trip(driver, trip)
+    return {
+        'route_points': upstreams.route_points,
+        'distance_miles': result['summary']['total_distance_miles'],
+        'days': len(result['plans']),
+        'cold': cold,
+        'warm': warm,
+        'upstream_requests': {name: count - before[name]
+                              for name, count in upstreams.requests.items()},
+    }
+
+
+def bench_validate_hos(drivers, days, sample):
+    from eld.hos_engine import validate_hos
+
+    end = date.today()
+    start = time.perf_counter()
+    created = populate_logs(drivers, days, end)
+    populate_seconds = time.perf_counter() - start
+
+    sampled = created[:sample]
+    start = time.perf_counter()
+    for driver in sampled:
+        validate_hos(driver, end)
+    elapsed = time.perf_counter() - start
+    return {
+        'drivers': drivers,
+        'days': days,
+        'log_rows': drivers * days * 6,
+        'populate_seconds': round(populate_seconds, 2),
+        'validated_drivers': len(sampled),
+        'per_driver_ms': round(elapsed / len(sampled) * 1000, 3),
+    }
+
+
+def bench_truck_stops(count, route_points):
+    import random
+
+    from trips.truck_stops import FUEL, REST, RouteLine, TruckStopIndex, build_index
+
+    rng = random.Random(0)
+    stops = [(f'Stop {i}', rng.uniform(25, 49), rng.uniform(-124, -67),
+              rng.choice((FUEL, REST, FUEL | REST))) for i in range(count)]
+    start = time.perf_counter()
+    data = build_index(stops)
+    build_seconds = time.perf_counter() - start
+
+    index = TruckStopIndex(data)
+    # New York to Los Angeles as a dense polyline; a stop window every 50 mi.
+    coordinates = [[-74.0 + (-118.2 + 74.0) * i / route_points,
+                    40.7 + (34.0 - 40.7) * i / route_points]
+                   for i in range(route_points + 1)]
+    start = time.perf_counter()
+    line = RouteLine(coordinates)
+    measure_ms = (time.perf_counter() - start) * 1000
+    targets = [miles for miles in range(50, int(line.length), 50)]
+    samples = []
+    for _ in range(10):
+        start = time.perf_counter()
+        found = index.along_route(line, targets, FUEL, 10, 150)
+        samples.append(time.perf_counter() - start)
+    return {
+        'stops': count,
+        'index_bytes': len(data),
+        'build_seconds': round(build_seconds, 2),
+        'route_miles': round(line.length),
+        'windows': len(targets),
+        'found': sum(stop is not None for stop in found),
+        'measure_route_ms': round(measure_ms, 2),
+        'lookup_ms': round(statistics.median(samples) * 1000, 2),
+    }
+
+
+class ApiServer:
+    """Serve the project's WSGI application on an ephemeral port."""
+
+    def __enter__(self):
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(get_wsgi_application())
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.url = f'http://{host}:{port}'
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def deep_page_url(first_url, depth):
+    """Follow ``next`` up to ``depth`` pages; return the last URL reached
+    and how many pages deep it is."""
+    url, page = first_url, 1
+    while page < depth:
+        following = http_json(url)['next']
+        if not following:
+            break
+        url, page = following, page + 1
+    return url, page
+
+
+def bench_http(trips, requests, plan_requests, concurrency, history_depth):
+    from eld.models import Driver
+
+    trip_ids = [trip.pk for trip in populate_trips(trips)][:1000]
+    driver_ids = list(Driver.objects.values_list('id', flat=True)[:1000])
+    results = {'trips': trips, 'concurrency': concurrency}
+    with ApiServer() as server:
+        base = server.url + '/api/trips/'
+        results['trip_history'] = run_load(
+            lambda i: http_request(base), requests, concurrency)
+        deep_url, depth = deep_page_url(f'{base}?page_size=20', history_depth)
+        results['trip_history_deep_page'] = dict(run_load(
+            lambda i: http_request(deep_url), requests // 4, concurrency), page=depth)
+        results['trip_detail'] = run_load(
+            lambda i: http_request(f'{base}{trip_ids[i % len(trip_ids)]}/'),
+            requests, concurrency)
+        results['driver_cycle'] = run_load(
+            lambda i: http_request(
+                f'{base}drivers/{driver_ids[i % len(driver_ids)]}/cycle/'),
+            requests, concurrency)
+        # Ten distinct routes, so the first requests miss the planning cache.
+        results['plan_trip'] = run_load(
+            lambda i: http_request(f'{base}plan/', {
+                'trip': dict(LONG_TRIP, origin=f'Depot {i % 10}, New York, NY'),
+                'driver': {'name': f'Load {i}', 'license_number': f'LOAD{i}',
+                           'current_cycle_hours': 0},
+            }),
+            plan_requests, concurrency)
+    return results
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f'{prefix}{key}.')
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix[:-1], value
+
+
+def compare(previous, current):
+    old = dict(flatten(previous['results']))
+    print(f"\nvs {previous['meta']['git_sha'][:12]}:")
+    for key, value in flatten(current['results']):
+        before = old.get(key)
+        if before is None:
+            continue
+        change = f'{(value - before) / before * 100:+.1f}%' if before else 'n/a'
+        print(f'  {key:<45} {before:>12} -> {value:<12} {change}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='Small data sizes, for a smoke run.')
+    parser.add_argument('--only', action='append',
+                        choices=['plan_trip', 'validate_hos', 'truck_stops', 'http'],
+                        help='Run only these benchmarks (repeatable).')
+    parser.add_argument('--geocode-latency', type=float, default=0.05,
+                        help='Seconds each fake Nominatim request takes.')
+    parser.add_argument('--route-latency', type=float, default=0.2,
+                        help='Seconds each fake OpenRouteService request takes.')
+    parser.add_argument('--out', type=Path)
+    parser.add_argument('--compare', type=Path, metavar='RESULTS_JSON')
+    for name in SIZES:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name)
+    args = parser.parse_args()
+
+    sizes = {name: getattr(args, name) or values[args.quick]
+             for name, values in SIZES.items()}
+    selected = args.only or ['plan_trip', 'validate_hos', 'truck_stops', 'http']
+    sha, dirty = git_revision()
+
+    with FakeUpstreams(args.geocode_latency, args.route_latency,
+                       sizes['route_points']) as upstreams:
+        os.environ.update(upstreams.environ())
+        # The stand-ins have no quota; set these to measure queueing instead.
+        for name, value in (('NOMINATIM_RATE_PER_SECOND', '1000'), ('NOMINATIM_BURST', '1000'),
+                            ('OPENROUTESERVICE_RATE_PER_MINUTE', '60000'),
+                            ('OPENROUTESERVICE_BURST', '1000')):
+            os.environ.setdefault(name, value)
+        setup_django()
+        import django
+
+        results = {}
+        if 'plan_trip' in selected:
+            results['plan_trip'] = bench_plan_trip(upstreams, sizes['plan_repeat'])
+        if 'validate_hos' in selected:
+            results['validate_hos'] = bench_validate_hos(
+                sizes['hos_drivers'], sizes['hos_days'], sizes['hos_sample'])
+        if 'truck_stops' in selected:
+            results['truck_stops'] = bench_truck_stops(
+                sizes['truck_stops'], sizes['route_points'])
+        if 'http' in selected:
+            results['http'] = bench_http(sizes['trips'], sizes['load_requests'],
+                                         sizes['plan_requests'], sizes['concurrency'],
+                                         sizes['history_depth'])
+
+    report = {
+        'meta': {
+            'git_sha': sha,
+            'dirty': dirty,
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+            'sizes': sizes,
+            'upstream_latency': {'geocode': args.geocode_latency,
+                                 'route': args.route_latency},
+        },
+        'results': results,
+    }
+    out = args.out or RESULTS_DIR / f'{sha[:12]}{"-dirty" if dirty else ""}.json'
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2) + '\n')
+    json.dump(results, sys.stdout, indent=2)
+    print(f'\nwrote {out}')
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Local stand-ins for Nominatim and OpenRouteService.
+
+``FakeUpstreams`` runs both on ephemeral localhost ports with a
+configurable per-request latency. Geocodes are derived from a hash of the
+address (somewhere in the continental US) and routes are straight-line
+legs with a road factor, carrying ``route_points`` geometry coordinates,
+so responses are deterministic and realistically sized.
+
+Point the app at them with ``NOMINATIM_DOMAIN``/``NOMINATIM_SCHEME`` and
+``OPENROUTESERVICE_BASE_URL`` (``FakeUpstreams.environ()``).
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROAD_FACTOR = 1.2
+SPEED_MPS = 26.8  # ~60 mph
+
+
+def fake_geocode(address):
+    digest = hashlib.sha256(' '.join(address.lower().split()).encode()).digest()
+    lat = 30 + digest[0] / 255 * 17  # 30..47 N
+    lng = -122 + digest[1] / 255 * 50  # -122..-72
+    return round(lat, 6), round(lng, 6)
+
+
+def haversine_m(a, b):
+    lng1, lat1, lng2, lat2 = map(math.radians, (*a, *b))
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def fake_directions(coordinates, route_points):
+    segments = []
+    for start, end in zip(coordinates, coordinates[1:]):
+        distance = haversine_m(start, end) * ROAD_FACTOR
+        segments.append({'distance': round(distance, 1),
+                         'duration': round(distance / SPEED_MPS, 1),
+                         'steps': []})
+
+    per_leg = max(2, route_points // max(1, len(segments)))
+    geometry = []
+    for start, end in zip(coordinates, coordinates[1:]):
+        for i in range(per_leg):
+            t = i / per_leg
+            geometry.append([round(start[0] + (end[0] - start[0]) * t, 6),
+                             round(start[1] + (end[1] - start[1]) * t, 6)])
+    geometry.append(list(coordinates[-1]))
+
+    return {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'bbox': [min(p[0] for p in geometry), min(p[1] for p in geometry),
+                     max(p[0] for p in geometry), max(p[1] for p in geometry)],
+            'properties': {
+                'segments': segments,
+                'summary': {'distance': sum(s['distance'] for s in segments),
+                            'duration': sum(s['duration'] for s in segments)},
+            },
+            'geometry': {'type': 'LineString', 'coordinates': geometry},
+        }],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    upstream = None  # set per server class
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.upstream.hit('nominatim')
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/search':
+            return self._reply({'error': 'not found'}, 404)
+        address = parse_qs(url.query).get('q', [''])[0]
+        lat, lng = fake_geocode(address)
+        self._reply([{'lat': str(lat), 'lon': str(lng), 'display_name': address}])
+
+    def do_POST(self):
+        self.upstream.hit('ors')
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.startswith('/v2/directions/'):
+            return self._reply({'error': 'not found'}, 404)
+        self._reply(fake_directions(body['coordinates'], self.upstream.route_points))
+
+
+class FakeUpstreams:
+    def __init__(self, geocode_latency=0.05, route_latency=0.2, route_points=5000):
+        self.latency = {'nominatim': geocode_latency, 'ors': route_latency}
+        self.route_points = route_points
+        self.requests = {'nominatim': 0, 'ors': 0}
+        self._lock = threading.Lock()
+        self._servers = []
+
+    def hit(self, name):
+        with self._lock:
+            self.requests[name] += 1
+        time.sleep(self.latency[name])
+
+    def __enter__(self):
+        handler = type('Handler', (_Handler,), {'upstream': self})
+        for _ in range(2):
+            server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        return self
+
+    def __exit__(self, *exc):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def environ(self):
+        nominatim, ors = (server.server_address for server in self._servers)
+        return {
+            'NOMINATIM_DOMAIN': f'{nominatim[0]}:{nominatim[1]}',
+            'NOMINATIM_SCHEME': 'http',
+            'OPENROUTESERVICE_BASE_URL': f'http://{ors[0]}:{ors[1]}',
+        }
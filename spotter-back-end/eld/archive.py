@@ -0,0 +1,167 @@
+"""Cold storage for old ``HOSLog`` rows.
+
+HOS rules never look back more than 8 days, so logs older than
+``HOS_ARCHIVE_AFTER_DAYS`` are moved into one ``HOSLogArchive`` row per
+driver per month. Each archive stores its logs column by column (an
+``array`` per field) and compresses the result with zlib, which keeps the
+hot table and its indexes small.
+
+``logs_for_driver`` reads both tiers and is what export and audit views use.
+"""
+import json
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from spotter_api.db_router import reading_driver
+
+from .models import HOSLog, HOSLogArchive
+
+FORMAT_VERSION = 1
+
+ArchivedLog = namedtuple(
+    'ArchivedLog', 'id driver_id date duty_status start_time duration')
+
+# (field, array typecode); duty_status is stored as an index into the
+# archive's own list of distinct statuses.
+COLUMNS = (
+    ('id', 'q'),
+    ('date', 'i'),  # proleptic Gregorian ordinal
+    ('duty_status', 'B'),
+    ('start_time', 'q'),  # microseconds since the Unix epoch, UTC
+    ('duration', 'i'),
+)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_logs(logs):
+    """Compress ``ArchivedLog``-like rows into a columnar blob."""
+    statuses = sorted({log.duty_status for log in logs})
+    index = {status: i for i, status in enumerate(statuses)}
+    columns = {
+        'id': [log.id for log in logs],
+        'date': [log.date.toordinal() for log in logs],
+        'duty_status': [index[log.duty_status] for log in logs],
+        'start_time': [(log.start_time - EPOCH) // timedelta(microseconds=1)
+                       for log in logs],
+        'duration': [log.duration for log in logs],
+    }
+    header = {
+        'version': FORMAT_VERSION,
+        'count': len(logs),
+        'statuses': statuses,
+        'byteorder': sys.byteorder,
+        'columns': COLUMNS,
+    }
+    body = b''.join(array(code, columns[name]).tobytes() for name, code in COLUMNS)
+    return zlib.compress(json.dumps(header).encode() + b'\n' + body, 9)
+
+
+def decode_logs(driver_id, data):
+    raw = zlib.decompress(bytes(data))
+    header, body = raw.split(b'\n', 1)
+    header = json.loads(header)
+    count = header['count']
+    columns = {}
+    offset = 0
+    for name, code in header['columns']:
+        column = array(code)
+        size = column.itemsize * count
+        column.frombytes(body[offset:offset + size])
+        if header['byteorder'] != sys.byteorder:
+            column.byteswap()
+        columns[name] = column
+        offset += size
+
+    statuses = header['statuses']
+    return [
+        ArchivedLog(
+            id=log_id,
+            driver_id=driver_id,
+            date=date.fromordinal(day),
+            duty_status=statuses[status],
+            start_time=EPOCH + timedelta(microseconds=start),
+            duration=duration,
+        )
+        for log_id, day, status, start, duration in zip(
+            columns['id'], columns['date'], columns['duty_status'],
+            columns['start_time'], columns['duration'])
+    ]
+
+
+def _month_rows(driver_id, month, cutoff):
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    return HOSLog.objects.using(DEFAULT_DB_ALIAS).filter(
+        driver_id=driver_id, date__gte=month, date__lt=min(next_month, cutoff),
+    ).order_by('start_time', 'id').values_list(
+        'id', 'driver_id', 'date', 'duty_status', 'start_time', 'duration')
+
+
+def archive_logs_before(cutoff, dry_run=False):
+    """Move every log dated before ``cutoff`` into monthly archives.
+
+    Returns ``(logs_archived, archives_written)``. Months that were partly
+    archived by an earlier run are merged with the new rows. Rows are read
+    from the primary, locked, in the same transaction that deletes them, so
+    neither replica lag nor a concurrent correction is archived stale.
+    """
+    old_logs = HOSLog.objects.using(DEFAULT_DB_ALIAS).filter(date__lt=cutoff)
+    driver_ids = list(
+        old_logs.order_by().values_list('driver_id', flat=True).distinct())
+    archived = written = 0
+    for driver_id in driver_ids:
+        months = sorted({
+            day.replace(day=1) for day in old_logs.filter(driver_id=driver_id)
+            .order_by().values_list('date', flat=True).distinct()})
+        for month in months:
+            if dry_run:
+                archived += _month_rows(driver_id, month, cutoff).count()
+                written += 1
+                continue
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                logs = [ArchivedLog(*row) for row in
+                        _month_rows(driver_id, month, cutoff).select_for_update()]
+                if not logs:
+                    continue
+                archived += len(logs)
+                written += 1
+                existing = HOSLogArchive.objects.select_for_update().filter(
+                    driver_id=driver_id, month=month).first()
+                if existing:
+                    known = {log.id for log in logs}
+                    merged = sorted(
+                        [log for log in decode_logs(driver_id, existing.data)
+                         if log.id not in known] + logs,
+                        key=lambda log: (log.start_time, log.id))
+                    existing.data = encode_logs(merged)
+                    existing.log_count = len(merged)
+                    existing.save(update_fields=['data', 'log_count'])
+                else:
+                    HOSLogArchive.objects.create(
+                        driver_id=driver_id, month=month, log_count=len(logs),
+                        data=encode_logs(logs))
+                HOSLog.objects.filter(id__in=[log.id for log in logs]).delete()
+    return archived, written
+
+
+def logs_for_driver(driver, start_date, end_date):
+    """A driver's logs dated ``start_date``..``end_date`` from both tiers,
+    ordered by start time. Archived rows are ``ArchivedLog`` tuples."""
+    driver_id = getattr(driver, 'pk', driver)
+    with reading_driver(driver_id):
+        logs = list(HOSLog.objects.filter(
+            driver_id=driver_id, date__range=(start_date, end_date)))
+        archives = list(HOSLogArchive.objects.filter(
+            driver_id=driver_id,
+            month__range=(start_date.replace(day=1), end_date),
+        ).only('data'))
+    for archive in archives:
+        logs.extend(
+            log for log in decode_logs(driver_id, archive.data)
+            if start_date <= log.date <= end_date)
+    return sorted(logs, key=lambda log: (log.start_time, log.id))
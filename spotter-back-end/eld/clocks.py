@@ -0,0 +1,169 @@
+"""Push a driver's remaining 11/14/70-hour clocks to live subscribers.
+
+Clocks are recomputed once per driver when a new ``HOSLog`` is committed
+(see ``eld.signals``) and the result is fanned out to every subscriber in
+this process, so many open dashboards cost a single set of queries.
+
+Only writes made by this worker are heard directly; when several workers
+run, each cached value is also refreshed at most every
+``HOS_CLOCK_RESYNC_SECONDS`` (again once per driver, not per subscriber).
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Driver
+from .timeline import D, ON_DUTY, DutyTimeline
+
+DRIVING_LIMIT = 11 * 60
+ON_DUTY_LIMIT = 14 * 60
+CYCLE_LIMIT = 70 * 60
+
+
+def compute_clocks(driver_id, day=None):
+    day = day or timezone.localdate()
+    week_start = day - timedelta(days=7)
+    timeline = DutyTimeline.for_driver(driver_id, week_start, day)
+    return {
+        'driver_id': driver_id,
+        'date': day.isoformat(),
+        'driving_remaining_minutes': max(
+            0, DRIVING_LIMIT - timeline.minutes((D,), day)),
+        'on_duty_remaining_minutes': max(
+            0, ON_DUTY_LIMIT - timeline.minutes(ON_DUTY, day)),
+        # Counted from the last 34-hour restart, as in ``validate_hos``.
+        'cycle_remaining_minutes': max(
+            0, CYCLE_LIMIT - timeline.cycle_minutes(week_start, day)),
+    }
+
+
+class ClockHub:
+    """In-process fan-out of driver clocks to any number of subscribers."""
+
+    def __init__(self, compute=compute_clocks):
+        self._compute = compute
+        self._lock = threading.Lock()
+        self._versions = {}  # driver_id -> bumped on every new log
+        self._cache = {}  # driver_id -> (version, computed_at, clocks)
+        self._pending = {}  # driver_id -> (version, in-flight recompute task)
+        self._subscribers = {}  # driver_id -> {(loop, asyncio.Event)}
+
+    def invalidate(self, driver_id):
+        """Mark a driver's clocks stale and wake its subscribers.
+
+        Safe to call from any thread (it runs from a post-commit hook).
+        """
+        with self._lock:
+            self._versions[driver_id] = self._versions.get(driver_id, 0) + 1
+            subscribers = list(self._subscribers.get(driver_id, ()))
+        for loop, event in subscribers:
+            loop.call_soon_threadsafe(event.set)
+
+    def subscriber_count(self, driver_id):
+        with self._lock:
+            return len(self._subscribers.get(driver_id, ()))
+
+    async def get(self, driver_id):
+        """Current clocks, recomputed at most once per invalidation."""
+        with self._lock:
+            version = self._versions.get(driver_id, 0)
+            cached = self._cache.get(driver_id)
+        max_age = settings.HOS_CLOCK_RESYNC_SECONDS
+        if cached and cached[0] == version and time.monotonic() - cached[1] < max_age:
+            return cached[2]
+
+        pending = self._pending.get(driver_id)
+        if pending is None or pending[0] != version:
+            pending = (version, asyncio.ensure_future(self._refresh(driver_id, version)))
+            self._pending[driver_id] = pending
+        return await asyncio.shield(pending[1])
+
+    async def _refresh(self, driver_id, version):
+        try:
+            clocks = await sync_to_async(self._compute)(driver_id)
+            with self._lock:
+                cached = self._cache.get(driver_id)
+                if cached is None or cached[0] <= version:
+                    self._cache[driver_id] = (version, time.monotonic(), clocks)
+            return clocks
+        finally:
+            if self._pending.get(driver_id, (None,))[0] == version:
+                del self._pending[driver_id]
+
+    async def subscribe(self, driver_id):
+        """Yield clocks now and again whenever they change.
+
+        Yields ``None`` when nothing changed for ``HOS_CLOCK_RESYNC_SECONDS``
+        so transports can send a keep-alive.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers.setdefault(driver_id, set()).add(entry)
+        try:
+            last = None
+            while True:
+                clocks = await self.get(driver_id)
+                if clocks != last:
+                    last = clocks
+                    yield clocks
+                try:
+                    await asyncio.wait_for(
+                        entry[1].wait(), settings.HOS_CLOCK_RESYNC_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                entry[1].clear()
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(driver_id, set())
+                subscribers.discard(entry)
+                if not subscribers:
+                    self._subscribers.pop(driver_id, None)
+
+
+hub = ClockHub()
+
+
+async def sse_events(driver_id):
+    """Server-Sent Events stream for ``hub.subscribe``."""
+    yield 'retry: 5000\n\n'
+    async for clocks in hub.subscribe(driver_id):
+        if clocks is None:
+            yield ': keep-alive\n\n'
+        else:
+            yield f"event: clocks\ndata: {json.dumps(clocks)}\n\n"
+
+
+WEBSOCKET_PATH = re.compile(r'^/ws/eld/drivers/(?P<driver_id>\d+)/clocks/?$')
+
+
+async def websocket_application(scope, receive, send):
+    """Bare ASGI WebSocket endpoint streaming the same clock payloads."""
+    match = WEBSOCKET_PATH.match(scope['path'])
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    driver_id = int(match['driver_id']) if match else None
+    if driver_id is None or not await Driver.objects.filter(pk=driver_id).aexists():
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def pump():
+        async for clocks in hub.subscribe(driver_id):
+            if clocks is not None:
+                await send({'type': 'websocket.send', 'text': json.dumps(clocks)})
+
+    pusher = asyncio.ensure_future(pump())
+    try:
+        # Client messages are ignored; we only wait for the disconnect.
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        pusher.cancel()
@@ -1,6 +1,6 @@
 from datetime import timedelta
 
-from .models import HOSLog
+from .timeline import D, ON_DUTY, DutyTimeline
 
 DUTY_STATUS = (
     ('OFF', 'Off Duty'),
@@ -11,64 +11,49 @@ DUTY_STATUS = (
 
 
 def get_daily_driving_hours(driver, date):
-    logs = HOSLog.objects.filter(driver=driver, date=date, duty_status='D')
-    return sum([timedelta(minutes=log.duration) for log in logs], timedelta())
+    timeline = DutyTimeline.for_driver(driver, date, date)
+    return timedelta(minutes=timeline.minutes((D,), date))
 
 
 def get_daily_on_duty_hours(driver, date):
-    logs = HOSLog.objects.filter(
-        driver=driver, date=date, duty_status__in=['D', 'ON'])
-    return sum([timedelta(minutes=log.duration) for log in logs], timedelta())
+    timeline = DutyTimeline.for_driver(driver, date, date)
+    return timedelta(minutes=timeline.minutes(ON_DUTY, date))
 
 
 def has_10_hour_rest(driver, date):
-    logs = HOSLog.objects.filter(
-        driver=driver, date=date).order_by('start_time')
-    off_period = timedelta()
-    for log in logs:
-        if log.duty_status in ['OFF', 'SB']:
-            off_period += timedelta(minutes=log.duration)
-            if off_period >= timedelta(hours=10):
-                return True
-        else:
-            off_period = timedelta()
-    return False
+    return DutyTimeline.for_driver(driver, date, date).has_rest(10 * 60, date)
 
 
 def get_rolling_8_day_hours(driver, end_date):
     start_date = end_date - timedelta(days=7)
-    logs = HOSLog.objects.filter(driver=driver, date__range=(
-        start_date, end_date), duty_status__in=['D', 'ON'])
-    return sum([timedelta(minutes=log.duration) for log in logs], timedelta())
+    timeline = DutyTimeline.for_driver(driver, start_date, end_date)
+    return timedelta(minutes=timeline.minutes(ON_DUTY, start_date, end_date))
 
 
 def can_restart_34_hour(driver, end_date):
     start_date = end_date - timedelta(days=7)
-    logs = HOSLog.objects.filter(driver=driver, date__range=(
-        start_date, end_date)).order_by('start_time')
-    off_period = timedelta()
-    last_end = None
-    for log in logs:
-        if log.duty_status in ['OFF', 'SB']:
-            if last_end and (log.start_time - last_end) > timedelta(minutes=1):
-                off_period = timedelta()
-            off_period += timedelta(minutes=log.duration)
-            if off_period >= timedelta(hours=34):
-                return True
-        else:
-            off_period = timedelta()
-        last_end = log.start_time + timedelta(minutes=log.duration)
-    return False
+    timeline = DutyTimeline.for_driver(driver, start_date, end_date)
+    return timeline.has_rest(34 * 60, start_date, end_date, max_gap=1)
 
 
 def validate_hos(driver, date):
+    """Check the daily and 8-day rules for ``date`` with a single query.
+
+    Loads one ``DutyTimeline`` covering the 8-day window and checks every
+    rule against it. A split sleeper-berth pairing counts as the 10-hour
+    rest, and a 34-hour restart resets the 70-hour cycle.
+    """
+    week_start = date - timedelta(days=7)
+    timeline = DutyTimeline.for_driver(driver, week_start, date)
     errors = []
-    if get_daily_driving_hours(driver, date) > timedelta(hours=11):
+    if timeline.minutes((D,), date) > 11 * 60:
         errors.append("Exceeded 11-hour driving limit.")
-    if get_daily_on_duty_hours(driver, date) > timedelta(hours=14):
+    if timeline.minutes(ON_DUTY, date) > 14 * 60:
         errors.append("Exceeded 14-hour on-duty limit.")
-    if not has_10_hour_rest(driver, date):
+    if timeline.needs_30_minute_break(date):
+        errors.append("Drove more than 8 hours without a 30-minute break.")
+    if not (timeline.has_rest(10 * 60, date) or timeline.has_split_sleeper_rest(date)):
         errors.append("No 10-hour consecutive rest.")
-    if get_rolling_8_day_hours(driver, date) > timedelta(hours=70):
+    if timeline.cycle_minutes(week_start, date) > 70 * 60:
         errors.append("Exceeded 70-hour/8-day cycle.")
     return errors
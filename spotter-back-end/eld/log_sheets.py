@@ -0,0 +1,307 @@
+"""Server-side rendering of FMCSA-style daily log sheets (SVG and PDF).
+
+A day is described by a header (date, driver, ...) and a list of duty
+segments ``(status, start_minute, end_minute)`` covering 00:00-24:00. Sheets
+are written under ``MEDIA_ROOT/LOG_SHEET_CACHE_DIR`` using a hash of that
+content as the file name, so an unchanged day is never rendered twice.
+
+Rendering helpers deliberately avoid touching the ORM or Django settings so
+they can run inside a process pool.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+
+# Bump whenever the drawing changes so stale cache entries are not served.
+RENDER_VERSION = 1
+
+ROW_ORDER = ('OFF', 'SB', 'D', 'ON')
+ROW_LABELS = {
+    'OFF': 'Off Duty',
+    'SB': 'Sleeper Berth',
+    'D': 'Driving',
+    'ON': 'On Duty (Not Driving)',
+}
+
+FORMATS = {
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+# Sheet geometry, in SVG user units (PDF pages are drawn at PDF_SCALE).
+LEFT = 170
+TOP = 70
+HOUR_WIDTH = 32
+ROW_HEIGHT = 36
+TOTALS_WIDTH = 70
+WIDTH = LEFT + 24 * HOUR_WIDTH + TOTALS_WIDTH
+HEIGHT = TOP + len(ROW_ORDER) * ROW_HEIGHT + 40
+PDF_SCALE = 2
+
+
+def _normalize(segments):
+    """Clip, sort and merge segments, filling any uncovered time as OFF."""
+    clipped = sorted(
+        (max(0, int(start)), min(MINUTES_PER_DAY, int(end)), status)
+        for status, start, end in segments
+        if status in ROW_LABELS and end > start
+    )
+    normalized = []
+    cursor = 0
+    for start, end, status in clipped:
+        start = max(start, cursor)
+        if start >= end:
+            continue
+        if start > cursor:
+            normalized.append(['OFF', cursor, start])
+        if normalized and normalized[-1][0] == status and normalized[-1][2] == start:
+            normalized[-1][2] = end
+        else:
+            normalized.append([status, start, end])
+        cursor = end
+    if cursor < MINUTES_PER_DAY:
+        if normalized and normalized[-1][0] == 'OFF':
+            normalized[-1][2] = MINUTES_PER_DAY
+        else:
+            normalized.append(['OFF', cursor, MINUTES_PER_DAY])
+    return [tuple(segment) for segment in normalized]
+
+
+def segments_from_logs(logs, day):
+    """Build the duty segments of ``day`` from ``HOSLog`` rows."""
+    segments = []
+    for log in logs:
+        midnight = datetime.combine(day, time(), tzinfo=log.start_time.tzinfo)
+        start = (log.start_time - midnight) // timedelta(minutes=1)
+        segments.append((log.duty_status, start, start + log.duration))
+    return _normalize(segments)
+
+
+def segments_from_plan(plan):
+    """Build duty segments from one daily plan returned by ``plan_trip``.
+
+    Plans only carry totals, so the day is laid out the same way the
+    front-end draws it: off duty, then on duty (not driving), then driving.
+    """
+    off_duty = round(plan.get('off_duty_hours', 0) * 60)
+    driving = round(plan.get('driving_hours', 0) * 60)
+    on_duty = round(plan.get('on_duty_hours', 0) * 60) - driving
+    segments = []
+    cursor = 0
+    for status, minutes in (('OFF', off_duty), ('ON', on_duty), ('D', driving)):
+        if minutes > 0:
+            segments.append((status, cursor, cursor + minutes))
+            cursor += minutes
+    return _normalize(segments)
+
+
+def sheet_key(header, segments, fmt):
+    """Content hash identifying a rendered sheet."""
+    payload = json.dumps(
+        [RENDER_VERSION, fmt, header, _normalize(segments)],
+        sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def sheet_path(cache_root, key, fmt):
+    return os.path.join(cache_root, key[:2], f"{key}.{fmt}")
+
+
+def _format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _hour_label(hour):
+    if hour in (0, 24):
+        return 'Mid'
+    if hour == 12:
+        return 'Noon'
+    return str(hour % 12)
+
+
+def _layout(header, segments):
+    """Describe the sheet as a list of ``line``/``rect``/``text`` primitives."""
+    shapes = []
+    title = f"Driver's Daily Log - {header.get('date', '')}"
+    shapes.append(('text', LEFT, 24, title, 16, 'start'))
+    details = '   '.join(
+        f"{name.replace('_', ' ').title()}: {value}"
+        for name, value in sorted(header.items())
+        if name != 'date' and value not in (None, ''))
+    if details:
+        shapes.append(('text', LEFT, 44, details, 11, 'start'))
+
+    grid_right = LEFT + 24 * HOUR_WIDTH
+    grid_bottom = TOP + len(ROW_ORDER) * ROW_HEIGHT
+    shapes.append(('rect', LEFT, TOP, grid_right, grid_bottom))
+    for hour in range(25):
+        x = LEFT + hour * HOUR_WIDTH
+        shapes.append(('text', x, TOP - 6, _hour_label(hour), 9, 'middle'))
+        if 0 < hour < 24:
+            shapes.append(('line', x, TOP, x, grid_bottom, 1))
+        if hour < 24:
+            for quarter in (1, 2, 3):
+                qx = x + quarter * HOUR_WIDTH / 4
+                tick = ROW_HEIGHT / (3 if quarter == 2 else 5)
+                for row in range(len(ROW_ORDER)):
+                    y = TOP + row * ROW_HEIGHT
+                    shapes.append(('line', qx, y, qx, y + tick, 1))
+
+    totals = {status: 0 for status in ROW_ORDER}
+    for status, start, end in segments:
+        totals[status] += end - start
+    for row, status in enumerate(ROW_ORDER):
+        y = TOP + row * ROW_HEIGHT
+        if row:
+            shapes.append(('line', LEFT, y, grid_right, y, 1))
+        mid = y + ROW_HEIGHT / 2 + 4
+        shapes.append(('text', LEFT - 8, mid, ROW_LABELS[status], 11, 'end'))
+        shapes.append(('text', grid_right + 8, mid,
+                      _format_minutes(totals[status]), 11, 'start'))
+    shapes.append(('text', grid_right + 8, grid_bottom + 20,
+                  _format_minutes(sum(totals.values())), 11, 'start'))
+
+    previous_y = None
+    for status, start, end in segments:
+        y = TOP + ROW_ORDER.index(status) * ROW_HEIGHT + ROW_HEIGHT / 2
+        x1 = LEFT + start * HOUR_WIDTH / 60
+        x2 = LEFT + end * HOUR_WIDTH / 60
+        if previous_y is not None and previous_y != y:
+            shapes.append(('line', x1, previous_y, x1, y, 3))
+        shapes.append(('line', x1, y, x2, y, 3))
+        previous_y = y
+    return shapes
+
+
+def _escape(text):
+    return (str(text).replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;'))
+
+
+def render_svg(header, segments):
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" '
+        f'height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        'font-family="Helvetica, Arial, sans-serif">',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="white"/>',
+    ]
+    for shape in _layout(header, _normalize(segments)):
+        kind = shape[0]
+        if kind == 'line':
+            _, x1, y1, x2, y2, width = shape
+            color = 'black' if width > 1 else '#888'
+            parts.append(
+                f'<line x1="{x1:g}" y1="{y1:g}" x2="{x2:g}" y2="{y2:g}" '
+                f'stroke="{color}" stroke-width="{width}"/>')
+        elif kind == 'rect':
+            _, x1, y1, x2, y2 = shape
+            parts.append(
+                f'<rect x="{x1:g}" y="{y1:g}" width="{x2 - x1:g}" '
+                f'height="{y2 - y1:g}" fill="none" stroke="black"/>')
+        else:
+            _, x, y, text, size, anchor = shape
+            parts.append(
+                f'<text x="{x:g}" y="{y:g}" font-size="{size}" '
+                f'text-anchor="{anchor}">{_escape(text)}</text>')
+    parts.append('</svg>')
+    return '\n'.join(parts).encode()
+
+
+def render_pdf(header, segments):
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new('RGB', (WIDTH * PDF_SCALE, HEIGHT * PDF_SCALE), 'white')
+    draw = ImageDraw.Draw(image)
+    fonts = {}
+    for shape in _layout(header, _normalize(segments)):
+        kind = shape[0]
+        if kind == 'line':
+            _, x1, y1, x2, y2, width = shape
+            color = 'black' if width > 1 else (136, 136, 136)
+            draw.line([(x1 * PDF_SCALE, y1 * PDF_SCALE),
+                       (x2 * PDF_SCALE, y2 * PDF_SCALE)],
+                      fill=color, width=width * PDF_SCALE)
+        elif kind == 'rect':
+            _, x1, y1, x2, y2 = shape
+            draw.rectangle([x1 * PDF_SCALE, y1 * PDF_SCALE,
+                            x2 * PDF_SCALE, y2 * PDF_SCALE],
+                           outline='black', width=PDF_SCALE)
+        else:
+            _, x, y, text, size, anchor = shape
+            if size not in fonts:
+                fonts[size] = ImageFont.load_default(size * PDF_SCALE)
+            draw.text((x * PDF_SCALE, y * PDF_SCALE), str(text), fill='black',
+                      font=fonts[size],
+                      anchor={'start': 'ls', 'middle': 'ms', 'end': 'rs'}[anchor])
+    buffer = io.BytesIO()
+    image.save(buffer, format='PDF', resolution=72 * PDF_SCALE)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'svg': render_svg,
+    'pdf': render_pdf,
+}
+
+
+def _write_sheet(path, fmt, header, segments):
+    """Render one sheet to ``path``; used directly and by pool workers."""
+    content = RENDERERS[fmt](header, segments)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename so concurrent renders never expose a partial file.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_log_sheets(sheets, fmt, cache_root, max_workers=1):
+    """Render ``(header, segments)`` pairs and return their cached paths.
+
+    Sheets already present in the cache are returned as-is; the remaining
+    ones are rendered in a process pool when there is more than one.
+    """
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unsupported log sheet format: {fmt}")
+    paths = []
+    pending = {}
+    for header, segments in sheets:
+        path = sheet_path(cache_root, sheet_key(header, segments, fmt), fmt)
+        paths.append(path)
+        if path not in pending and not os.path.exists(path):
+            pending[path] = (path, fmt, header, segments)
+    pending = list(pending.values())
+
+    if len(pending) > 1 and max_workers > 1:
+        pending = _render_in_pool(pending, max_workers)
+    for job in pending:
+        _write_sheet(*job)
+    return paths
+
+
+def _render_in_pool(jobs, max_workers):
+    """Render ``jobs`` across processes and return the ones still to be
+    rendered serially because no pool could be started (AWS Lambda, for
+    one, has no ``/dev/shm`` for its semaphores)."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # Workers come from a fork server rather than forking the (threaded)
+    # web worker that is handling the request.
+    context = (multiprocessing.get_context('forkserver')
+               if 'forkserver' in multiprocessing.get_all_start_methods() else None)
+    try:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)),
+                                 mp_context=context) as pool:
+            list(pool.map(_write_sheet, *zip(*jobs)))
+    except (OSError, NotImplementedError, BrokenProcessPool):
+        return [job for job in jobs if not os.path.exists(job[0])]
+    return []
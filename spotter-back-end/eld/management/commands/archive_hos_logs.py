@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from eld.archive import archive_logs_before
+
+# HOS rules look back 8 days; the timeline also reads one day further for
+# logs that run past midnight.
+MIN_DAYS = 9
+
+
+class Command(BaseCommand):
+    help = "Move HOS logs older than the archive horizon into compressed monthly archives."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.HOS_ARCHIVE_AFTER_DAYS,
+            help=f"Archive logs dated more than this many days ago (default: {settings.HOS_ARCHIVE_AFTER_DAYS}).")
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report what would be archived without changing anything.")
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if days < MIN_DAYS:
+            raise CommandError(
+                f"--older-than-days must be at least {MIN_DAYS}; HOS checks read the last 8 days.")
+
+        cutoff = timezone.localdate() - timedelta(days=days)
+        archived, written = archive_logs_before(cutoff, dry_run=options['dry_run'])
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {archived} logs dated before {cutoff} into {written} driver-month archives."))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HOSLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('log_count', models.IntegerField()),
+                ('codec', models.CharField(default='zlib', max_length=10)),
+                ('data', models.BinaryField()),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hos_log_archives', to='eld.driver')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('driver', 'month'), name='unique_hos_archive_month')],
+            },
+        ),
+    ]
@@ -21,3 +21,25 @@ class HOSLog(models.Model):
 
     def __str__(self):
         return f"HOS Log for {self.driver.name} on {self.date}"
+
+
+class HOSLogArchive(models.Model):
+    """One driver-month of ``HOSLog`` rows moved out of the hot table.
+
+    ``data`` holds the rows column by column (see ``eld.archive``).
+    """
+    driver = models.ForeignKey(
+        Driver, related_name='hos_log_archives', on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the month
+    log_count = models.IntegerField()
+    codec = models.CharField(max_length=10, default='zlib')
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['driver', 'month'], name='unique_hos_archive_month'),
+        ]
+
+    def __str__(self):
+        return f"HOS archive for {self.driver_id} ({self.month:%Y-%m}, {self.log_count} logs)"
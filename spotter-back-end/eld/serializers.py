@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from .log_sheets import FORMATS
+
+# Upper bound on the days one request may render.
+MAX_PLAN_SHEETS = 31
+
+
+class PlanDaySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    driving_hours = serializers.FloatField(min_value=0, max_value=24, default=0)
+    on_duty_hours = serializers.FloatField(min_value=0, max_value=24, default=0)
+    off_duty_hours = serializers.FloatField(min_value=0, max_value=24, default=0)
+
+
+class SheetDriverSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100, required=False, allow_null=True)
+
+
+class PlanLogSheetsSerializer(serializers.Serializer):
+    plans = serializers.ListField(
+        child=PlanDaySerializer(), allow_empty=False, max_length=MAX_PLAN_SHEETS)
+    driver = SheetDriverSerializer(required=False)
+    output = serializers.ChoiceField(choices=list(FORMATS), default='pdf')
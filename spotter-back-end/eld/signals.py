@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from spotter_api.db_router import pin_to_primary
+
+from .clocks import hub
+from .models import HOSLog
+
+
+@receiver(post_save, sender=HOSLog)
+def invalidate_driver_clocks(sender, instance, created, **kwargs):
+    driver_id = instance.driver_id
+    transaction.on_commit(lambda: hub.invalidate(driver_id))
+
+
+@receiver(post_save, sender=HOSLog)
+def pin_driver_reads(sender, instance, **kwargs):
+    # ``objects.create()`` routes without the instance, so pin here too.
+    pin_to_primary(instance.driver_id)
@@ -1,3 +1,486 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import archive, hos_engine, log_sheets
+from .clocks import ClockHub, compute_clocks
+from .models import Driver, HOSLog, HOSLogArchive
+from .timeline import DutyTimeline
+
+
+class LogSheetSegmentsTests(TestCase):
+    def test_logs_fill_gaps_as_off_duty_and_merge(self):
+        driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        day = date(2025, 1, 6)
+        for hour, status, minutes in ((6, 'ON', 60), (7, 'D', 240), (11, 'D', 60)):
+            HOSLog.objects.create(
+                driver=driver, date=day, duty_status=status, duration=minutes,
+                start_time=datetime(2025, 1, 6, hour, tzinfo=timezone.utc))
+
+        segments = log_sheets.segments_from_logs(
+            HOSLog.objects.order_by('start_time'), day)
+
+        self.assertEqual(segments, [
+            ('OFF', 0, 360), ('ON', 360, 420), ('D', 420, 720), ('OFF', 720, 1440)])
+
+    def test_plan_layout_matches_front_end(self):
+        plan = {'driving_hours': 11, 'on_duty_hours': 14, 'off_duty_hours': 10}
+        self.assertEqual(log_sheets.segments_from_plan(plan), [
+            ('OFF', 0, 600), ('ON', 600, 780), ('D', 780, 1440)])
+
+
+class LogSheetRenderingTests(TestCase):
+    def setUp(self):
+        self.cache_root = tempfile.mkdtemp()
+        self.sheet = ({'date': '2025-01-06', 'driver': 'Ann'},
+                      [('OFF', 0, 600), ('D', 600, 1260)])
+
+    def test_svg_is_cached_by_content(self):
+        [path] = log_sheets.render_log_sheets([self.sheet], 'svg', self.cache_root)
+        with open(path, 'rb') as handle:
+            self.assertIn(b'<svg', handle.read())
+
+        with mock.patch.object(log_sheets, '_write_sheet') as write:
+            again = log_sheets.render_log_sheets([self.sheet], 'svg', self.cache_root)
+        write.assert_not_called()
+        self.assertEqual(again, [path])
+
+        changed = (self.sheet[0], [('OFF', 0, 660), ('D', 660, 1260)])
+        [other] = log_sheets.render_log_sheets([changed], 'svg', self.cache_root)
+        self.assertNotEqual(other, path)
+
+    def test_bundle_renders_pdfs_in_pool(self):
+        sheets = [({'date': f'2025-01-0{day}'}, self.sheet[1]) for day in range(1, 4)]
+        paths = log_sheets.render_log_sheets(
+            sheets, 'pdf', self.cache_root, max_workers=2)
+        self.assertEqual(len(set(paths)), 3)
+        for path in paths:
+            with open(path, 'rb') as handle:
+                self.assertTrue(handle.read().startswith(b'%PDF'))
+
+    def test_bundle_renders_serially_without_a_pool(self):
+        sheets = [({'date': f'2025-01-0{day}'}, self.sheet[1]) for day in range(1, 4)]
+        with mock.patch('concurrent.futures.ProcessPoolExecutor',
+                        side_effect=OSError(38, 'Function not implemented')):
+            paths = log_sheets.render_log_sheets(
+                sheets, 'svg', self.cache_root, max_workers=4)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+
+class LogSheetViewTests(TestCase):
+    def setUp(self):
+        override = override_settings(MEDIA_ROOT=tempfile.mkdtemp(), LOG_SHEET_MAX_WORKERS=1)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_driver_log_sheet(self):
+        driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        url = reverse('driver-log-sheet', args=[driver.id, '2025-01-06'])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'Ann', b''.join(response.streaming_content))
+
+        self.assertEqual(self.client.get(url, {'output': 'png'}).status_code, 400)
+
+    def test_plan_log_sheets(self):
+        plans = [
+            {'date': '2025-01-06', 'driving_hours': 11, 'on_duty_hours': 14, 'off_duty_hours': 10},
+            {'date': '2025-01-07', 'driving_hours': 3, 'on_duty_hours': 4, 'off_duty_hours': 20},
+        ]
+        response = self.client.post(
+            reverse('plan-log-sheets'), {'plans': plans, 'output': 'svg'},
+            content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        sheets = response.json()['log_sheets']
+        self.assertEqual([sheet['date'] for sheet in sheets], ['2025-01-06', '2025-01-07'])
+        # Served from the cache, and re-rendered by an instance without it.
+        for media_root in (settings.MEDIA_ROOT, tempfile.mkdtemp()):
+            with self.settings(MEDIA_ROOT=media_root):
+                for sheet in sheets:
+                    response = self.client.get(sheet['url'])
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response['Content-Type'], 'image/svg+xml')
+                    self.assertIn(b'<svg', b''.join(response.streaming_content))
+
+        tampered = sheets[0]['url'].replace('.svg', 'x.svg')
+        self.assertEqual(self.client.get(tampered).status_code, 404)
+
+    def test_plan_log_sheets_rejects_bad_input(self):
+        day = {'date': '2025-01-06', 'driving_hours': 3}
+        for body in (
+            {'plans': ['x']},
+            {'plans': [{'driving_hours': 3}]},
+            {'plans': [{'date': '2025-01-06', 'driving_hours': 'three'}]},
+            {'plans': [dict(day, on_duty_hours=25)]},
+            {'plans': [day], 'driver': 'bob'},
+            {'plans': [day], 'output': 'png'},
+            {'plans': []},
+            {'plans': [day] * 32},
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    reverse('plan-log-sheets'), body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+class ClockComputationTests(TestCase):
+    def test_remaining_clocks_from_logs(self):
+        driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        day = date(2025, 1, 6)
+        for hour, status, minutes in ((6, 'ON', 60), (7, 'D', 300)):
+            HOSLog.objects.create(
+                driver=driver, date=day, duty_status=status, duration=minutes,
+                start_time=datetime(2025, 1, 6, hour, tzinfo=timezone.utc))
+        HOSLog.objects.create(
+            driver=driver, date=date(2025, 1, 3), duty_status='D', duration=600,
+            start_time=datetime(2025, 1, 3, 6, tzinfo=timezone.utc))
+
+        clocks = compute_clocks(driver.id, day)
+
+        self.assertEqual(clocks['driving_remaining_minutes'], 660 - 300)
+        self.assertEqual(clocks['on_duty_remaining_minutes'], 840 - 360)
+        self.assertEqual(clocks['cycle_remaining_minutes'], 4200 - 960)
+
+    def test_cycle_counts_from_the_last_restart(self):
+        driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        day = date(2025, 1, 8)
+        # 14 on-duty hours on each of the first five days, then a 34-hour restart.
+        for offset in range(5):
+            start = datetime(2025, 1, 1 + offset, 6, tzinfo=timezone.utc)
+            HOSLog.objects.create(driver=driver, date=start.date(), duty_status='D',
+                                  duration=840, start_time=start)
+        HOSLog.objects.create(
+            driver=driver, date=date(2025, 1, 5), duty_status='OFF', duration=34 * 60,
+            start_time=datetime(2025, 1, 5, 20, tzinfo=timezone.utc))
+        HOSLog.objects.create(
+            driver=driver, date=day, duty_status='D', duration=120,
+            start_time=datetime(2025, 1, 8, 6, tzinfo=timezone.utc))
+
+        clocks = compute_clocks(driver.id, day)
+
+        # 4,320 on-duty minutes in the window, but only 120 since the restart.
+        self.assertEqual(clocks['cycle_remaining_minutes'], 4200 - 120)
+        self.assertNotIn("Exceeded 70-hour/8-day cycle.", hos_engine.validate_hos(driver, day))
+
+    def test_new_log_invalidates_after_commit(self):
+        driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        with mock.patch('eld.signals.hub') as hub:
+            with self.captureOnCommitCallbacks(execute=True):
+                HOSLog.objects.create(
+                    driver=driver, date=date(2025, 1, 6), duty_status='D',
+                    duration=30, start_time=datetime(2025, 1, 6, tzinfo=timezone.utc))
+                hub.invalidate.assert_not_called()
+        hub.invalidate.assert_called_once_with(driver.id)
+
+
+@override_settings(HOS_CLOCK_RESYNC_SECONDS=60)
+class ClockHubTests(SimpleTestCase):
+    async def test_one_recompute_fans_out_to_all_subscribers(self):
+        calls = []
+
+        def compute(driver_id):
+            calls.append(driver_id)
+            return {'driver_id': driver_id, 'version': len(calls)}
+
+        hub = ClockHub(compute)
+        streams = [hub.subscribe(7) for _ in range(5)]
+        first = await asyncio.gather(*(anext(stream) for stream in streams))
+        self.assertEqual({clocks['version'] for clocks in first}, {1})
+        self.assertEqual(hub.subscriber_count(7), 5)
+
+        hub.invalidate(7)
+        second = await asyncio.gather(*(anext(stream) for stream in streams))
+        self.assertEqual({clocks['version'] for clocks in second}, {2})
+        self.assertEqual(calls, [7, 7])
+
+        for stream in streams:
+            await stream.aclose()
+        self.assertEqual(hub.subscriber_count(7), 0)
+
+
+class ClockStreamViewTests(TestCase):
+    async def test_sse_stream_sends_current_clocks(self):
+        driver = await sync_to_async(Driver.objects.create)(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+
+        response = await self.async_client.get(
+            reverse('driver-clock-stream', args=[driver.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content
+        self.assertEqual(await anext(events), b'retry: 5000\n\n')
+        event = (await anext(events)).decode()
+        await events.aclose()
+
+        self.assertTrue(event.startswith('event: clocks\ndata: '))
+        clocks = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(clocks['driving_remaining_minutes'], 660)
+
+    async def test_unknown_driver(self):
+        response = await self.async_client.get(
+            reverse('driver-clock-stream', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ClockWebSocketTests(TestCase):
+    async def connect(self, path):
+        """Run a WebSocket session through the ASGI app; the client
+        disconnects after the first frame it receives."""
+        from spotter_api.asgi import application
+
+        received = asyncio.Event()
+        incoming = [{'type': 'websocket.connect'}]
+        sent = []
+
+        async def receive():
+            if incoming:
+                return incoming.pop()
+            await received.wait()
+            return {'type': 'websocket.disconnect', 'code': 1000}
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'websocket.send':
+                received.set()
+
+        await asyncio.wait_for(
+            application({'type': 'websocket', 'path': path}, receive, send), 5)
+        return sent
+
+    async def test_streams_clocks(self):
+        driver = await sync_to_async(Driver.objects.create)(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        sent = await self.connect(f'/ws/eld/drivers/{driver.id}/clocks/')
+        self.assertEqual(sent[0], {'type': 'websocket.accept'})
+        clocks = json.loads(sent[1]['text'])
+        self.assertEqual((clocks['driver_id'], clocks['driving_remaining_minutes']),
+                         (driver.id, 660))
+
+    async def test_unknown_driver_or_path_is_closed(self):
+        for path in ('/ws/eld/drivers/999/clocks/', '/ws/nowhere/'):
+            with self.subTest(path=path):
+                self.assertEqual(await self.connect(path),
+                                 [{'type': 'websocket.close', 'code': 4404}])
+
+
+def random_logs(rng, driver, first_day, days):
+    """Random back-to-back duty logs, occasionally with gaps, split at midnight
+    the way ELDs record them."""
+    cursor = datetime.combine(first_day, datetime.min.time(), tzinfo=timezone.utc)
+    end = cursor + timedelta(days=days)
+    logs = []
+    while cursor < end:
+        cursor += timedelta(minutes=rng.choice([0, 0, 0, 0, 1, 2, rng.randint(3, 240)]))
+        status = rng.choices(['OFF', 'SB', 'D', 'ON', 'PC'], [4, 3, 4, 2, 1])[0]
+        remaining = rng.choice([rng.randint(1, 120), rng.randint(120, 900), rng.randint(900, 2400)])
+        while remaining > 0 and cursor < end:
+            midnight = datetime.combine(
+                cursor.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+            minutes = min(remaining, (midnight - cursor) // timedelta(minutes=1))
+            logs.append(HOSLog(driver=driver, date=cursor.date(), duty_status=status,
+                               start_time=cursor, duration=minutes))
+            cursor += timedelta(minutes=minutes)
+            remaining -= minutes
+    return logs
+
+
+def rows_minutes(driver, start_date, end_date, statuses):
+    """Row-by-row reference for the timeline totals."""
+    logs = HOSLog.objects.filter(
+        driver=driver, date__range=(start_date, end_date), duty_status__in=statuses)
+    return sum(log.duration for log in logs)
+
+
+def rows_has_rest(driver, start_date, end_date, hours, contiguous=False):
+    """Row-by-row reference for ``has_rest``: OFF/SB logs in a row, and with
+    ``contiguous`` no more than a minute between them."""
+    logs = HOSLog.objects.filter(
+        driver=driver, date__range=(start_date, end_date)).order_by('start_time')
+    off_period = timedelta()
+    last_end = None
+    for log in logs:
+        if log.duty_status in ['OFF', 'SB']:
+            if contiguous and last_end and (log.start_time - last_end) > timedelta(minutes=1):
+                off_period = timedelta()
+            off_period += timedelta(minutes=log.duration)
+            if off_period >= timedelta(hours=hours):
+                return True
+        else:
+            off_period = timedelta()
+        last_end = log.start_time + timedelta(minutes=log.duration)
+    return False
+
+
+class DutyTimelinePropertyTests(TestCase):
+    """The timeline-backed rules must agree with row-by-row evaluation."""
+
+    def test_matches_row_by_row_rules(self):
+        rng = random.Random(20250106)
+        first_day, days = date(2025, 1, 1), 12
+        for index in range(25):
+            driver = Driver.objects.create(
+                name=f'Driver {index}', license_number=f'P{index}', current_cycle_hours=0)
+            HOSLog.objects.bulk_create(random_logs(rng, driver, first_day, days))
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                week_start = day - timedelta(days=7)
+                with self.subTest(driver=index, day=day):
+                    self.assertEqual(
+                        hos_engine.get_daily_driving_hours(driver, day),
+                        timedelta(minutes=rows_minutes(driver, day, day, ['D'])))
+                    self.assertEqual(
+                        hos_engine.get_daily_on_duty_hours(driver, day),
+                        timedelta(minutes=rows_minutes(driver, day, day, ['D', 'ON'])))
+                    self.assertEqual(
+                        hos_engine.get_rolling_8_day_hours(driver, day),
+                        timedelta(minutes=rows_minutes(driver, week_start, day, ['D', 'ON'])))
+                    self.assertEqual(
+                        hos_engine.has_10_hour_rest(driver, day),
+                        rows_has_rest(driver, day, day, 10))
+                    self.assertEqual(
+                        hos_engine.can_restart_34_hour(driver, day),
+                        rows_has_rest(driver, week_start, day, 34, contiguous=True))
+
+    def test_validate_hos_uses_one_query(self):
+        driver = Driver.objects.create(name='Ann', license_number='L1', current_cycle_hours=0)
+        HOSLog.objects.bulk_create(random_logs(random.Random(1), driver, date(2025, 1, 1), 8))
+        with self.assertNumQueries(1):
+            hos_engine.validate_hos(driver, date(2025, 1, 8))
+
+
+class ValidateHOSTests(TestCase):
+    day = date(2025, 1, 8)
+
+    def setUp(self):
+        self.driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+
+    def log(self, day, *entries):
+        cursor = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+        for status, minutes in entries:
+            HOSLog.objects.create(driver=self.driver, date=cursor.date(), duty_status=status,
+                                  start_time=cursor, duration=minutes)
+            cursor += timedelta(minutes=minutes)
+
+    def test_split_sleeper_counts_as_rest(self):
+        self.log(self.day, ('SB', 480), ('D', 300), ('OFF', 120), ('D', 240), ('OFF', 300))
+        self.assertEqual(hos_engine.validate_hos(self.driver, self.day), [])
+
+    def test_30_minute_break(self):
+        self.log(self.day, ('OFF', 600), ('D', 540), ('OFF', 300))
+        self.assertEqual(hos_engine.validate_hos(self.driver, self.day),
+                         ["Drove more than 8 hours without a 30-minute break."])
+
+    def test_34_hour_restart_resets_cycle(self):
+        workday = (('OFF', 600), ('D', 480), ('OFF', 30), ('ON', 330))
+        for offset in range(7, 0, -1):
+            self.log(self.day - timedelta(days=offset), *workday)
+        self.log(self.day, *workday)
+        self.assertEqual(hos_engine.validate_hos(self.driver, self.day),
+                         ["Exceeded 70-hour/8-day cycle."])
+
+        HOSLog.objects.filter(date=self.day - timedelta(days=2)).delete()
+        self.log(self.day - timedelta(days=2), ('OFF', 24 * 60))
+        self.assertEqual(hos_engine.validate_hos(self.driver, self.day), [])
+
+
+def timeline_of(*entries, days=1):
+    """Timeline for ``days`` days from 2025-01-06, built from ``(status,
+    minutes)`` pairs starting at 00:00; a ``None`` status leaves the minutes
+    unlogged."""
+    cursor = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    logs = []
+    for status, minutes in entries:
+        if status:
+            logs.append(SimpleNamespace(
+                duty_status=status, start_time=cursor, duration=minutes))
+        cursor += timedelta(minutes=minutes)
+    return DutyTimeline.from_logs(
+        logs, date(2025, 1, 6), date(2025, 1, 6) + timedelta(days=days - 1))
+
+
+class DutyTimelineRuleTests(SimpleTestCase):
+    day = date(2025, 1, 6)
+
+    def test_split_sleeper_berth(self):
+        self.assertTrue(timeline_of(
+            ('SB', 480), ('D', 300), ('OFF', 120), ('D', 240)).has_split_sleeper_rest(self.day))
+        self.assertFalse(timeline_of(
+            ('SB', 420), ('D', 300), ('OFF', 120), ('D', 240)).has_split_sleeper_rest(self.day))
+        self.assertFalse(timeline_of(
+            ('SB', 480), ('OFF', 120), ('D', 600)).has_split_sleeper_rest(self.day))
+
+    def test_30_minute_break(self):
+        self.assertTrue(timeline_of(
+            ('OFF', 360), ('D', 300), ('ON', 20), ('D', 200)).needs_30_minute_break(self.day))
+        self.assertFalse(timeline_of(
+            ('OFF', 360), ('D', 300), ('ON', 15), ('OFF', 15), ('D', 200)).needs_30_minute_break(self.day))
+
+    def test_cycle_counts_from_last_restart(self):
+        end = self.day + timedelta(days=1)
+        timeline = timeline_of(('ON', 300), ('OFF', 34 * 60 - 1), ('D', 60), days=2)
+        self.assertEqual(timeline.cycle_minutes(self.day, end), 360)
+        timeline = timeline_of(('ON', 300), ('OFF', 34 * 60), ('D', 60), days=2)
+        self.assertEqual(timeline.cycle_minutes(self.day, end), 60)
+
+    def test_gaps_break_restart_but_not_daily_rest(self):
+        timeline = timeline_of(('OFF', 300), (None, 5), ('OFF', 300))
+        self.assertTrue(timeline.has_rest(600, self.day))
+        self.assertFalse(timeline.has_rest(600, self.day, max_gap=1))
+
+
+class HOSArchiveTests(TestCase):
+    def setUp(self):
+        self.driver = Driver.objects.create(
+            name='Ann', license_number='L1', current_cycle_hours=0)
+        HOSLog.objects.bulk_create(random_logs(
+            random.Random(7), self.driver, date(2025, 1, 20), 30))
+
+    def test_columnar_roundtrip(self):
+        logs = [archive.ArchivedLog(*row) for row in HOSLog.objects.values_list(
+            'id', 'driver_id', 'date', 'duty_status', 'start_time', 'duration')]
+        self.assertEqual(archive.decode_logs(self.driver.id, archive.encode_logs(logs)), logs)
+
+    def test_command_moves_old_logs_and_reads_stay_transparent(self):
+        url = reverse('driver-log-export', args=[self.driver.id])
+        query = {'start': '2025-01-01', 'end': '2025-02-28'}
+        before = self.client.get(url, query).json()['logs']
+        recent = HOSLog.objects.filter(date__gte=date(2025, 2, 10)).count()
+
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2025, 2, 19)):
+            call_command('archive_hos_logs', '--older-than-days=9', stdout=StringIO())
+
+        self.assertEqual(HOSLog.objects.count(), recent)
+        self.assertEqual(
+            sorted(HOSLogArchive.objects.values_list('month', flat=True)),
+            [date(2025, 1, 1), date(2025, 2, 1)])
+        self.assertEqual(self.client.get(url, query).json()['logs'], before)
+
+        # A later run merges into the existing month instead of replacing it.
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2025, 2, 25)):
+            call_command('archive_hos_logs', '--older-than-days=9', stdout=StringIO())
+        self.assertEqual(HOSLogArchive.objects.count(), 2)
+        self.assertEqual(self.client.get(url, query).json()['logs'], before)
+
+    def test_horizon_must_cover_hos_lookback(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_hos_logs', '--older-than-days=3')
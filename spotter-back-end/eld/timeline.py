@@ -0,0 +1,191 @@
+"""Minute-resolution duty timelines for evaluating HOS rules.
+
+A ``DutyTimeline`` is built once from a driver's ``HOSLog`` rows: one byte
+per minute in an ``array('B')`` plus the run-length encoded intervals
+derived from it. Totals are computed with C-level ``array.count`` over
+slices and every rest/break rule is a single pass over the runs, instead
+of re-querying and rebuilding ``timedelta``s per row for each rule.
+
+Minutes are attributed by clock time, so a log that crosses midnight
+counts toward both days, and rest periods spanning midnight are seen as
+one run by the multi-day checks.
+"""
+import re
+from array import array
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from spotter_api.db_router import reading_driver
+
+from .models import HOSLog
+
+OFF, SB, D, ON, OTHER = range(5)
+UNKNOWN = 255  # no log covers this minute
+CODES = {'OFF': OFF, 'SB': SB, 'D': D, 'ON': ON}
+REST = (OFF, SB)
+ON_DUTY = (D, ON)
+
+MINUTES_PER_DAY = 24 * 60
+
+# One match per run of identical bytes, so run-length encoding happens in C.
+_RUN = re.compile(rb'(.)\1*', re.DOTALL)
+
+
+class DutyTimeline:
+    def __init__(self, origin, codes):
+        self.origin = origin  # aware datetime of minute 0 (a midnight)
+        self.codes = codes
+        self.runs = [
+            (match.group()[0], match.start(), match.end())
+            for match in _RUN.finditer(codes.tobytes())
+        ]
+        self._run_starts = [start for _, start, _ in self.runs]
+
+    @classmethod
+    def from_logs(cls, logs, start_date, end_date):
+        """Timeline covering ``start_date`` 00:00 to ``end_date`` 24:00."""
+        tz = timezone.get_current_timezone()
+        origin = datetime.combine(start_date, time(), tzinfo=tz)
+        size = ((end_date - start_date).days + 1) * MINUTES_PER_DAY
+        codes = array('B', [UNKNOWN]) * size
+        for log in logs:
+            start = (log.start_time - origin) // timedelta(minutes=1)
+            end = min(size, start + log.duration)
+            start = max(0, start)
+            if end > start:
+                code = CODES.get(log.duty_status, OTHER)
+                codes[start:end] = array('B', [code]) * (end - start)
+        return cls(origin, codes)
+
+    @classmethod
+    def for_driver(cls, driver, start_date, end_date):
+        """Load every log touching the date range with a single query."""
+        tz = timezone.get_current_timezone()
+        window_start = datetime.combine(start_date, time(), tzinfo=tz)
+        window_end = datetime.combine(
+            end_date + timedelta(days=1), time(), tzinfo=tz)
+        # Logs are at most a day long, so look back one day for any that
+        # started before the window but run into it.
+        with reading_driver(getattr(driver, 'pk', driver)):
+            logs = list(HOSLog.objects.filter(
+                driver=driver,
+                start_time__gte=window_start - timedelta(days=1),
+                start_time__lt=window_end,
+            ).only('duty_status', 'start_time', 'duration').order_by('start_time'))
+        return cls.from_logs(logs, start_date, end_date)
+
+    def window(self, start_date, end_date=None):
+        """Minute offsets ``[start, end)`` of a date range in this timeline."""
+        end_date = end_date or start_date
+        tz = self.origin.tzinfo
+        start = (datetime.combine(start_date, time(), tzinfo=tz)
+                 - self.origin) // timedelta(minutes=1)
+        end = (datetime.combine(end_date + timedelta(days=1), time(), tzinfo=tz)
+               - self.origin) // timedelta(minutes=1)
+        return max(0, start), min(len(self.codes), end)
+
+    def _runs_in(self, start, end):
+        """Runs overlapping ``[start, end)``, clipped to it."""
+        index = max(0, bisect_right(self._run_starts, start) - 1)
+        for code, run_start, run_end in self.runs[index:]:
+            if run_start >= end:
+                break
+            if run_end > start:
+                yield code, max(run_start, start), min(run_end, end)
+
+    def minutes(self, statuses, start_date, end_date=None):
+        start, end = self.window(start_date, end_date)
+        codes = self.codes[start:end]
+        return sum(codes.count(code) for code in statuses)
+
+    def longest_rest(self, start, end, max_gap=None):
+        """Longest stretch of OFF/SB minutes within ``[start, end)``.
+
+        Unlogged time does not count as rest; gaps up to ``max_gap``
+        minutes (any length when ``None``) bridge two rest periods, longer
+        ones end it.
+        """
+        longest = current = 0
+        for code, run_start, run_end in self._runs_in(start, end):
+            length = run_end - run_start
+            if code in REST:
+                current += length
+                longest = max(longest, current)
+            elif code != UNKNOWN or (max_gap is not None and length > max_gap):
+                current = 0
+        return longest
+
+    def last_rest_end(self, minutes, start, end, max_gap=None):
+        """Offset where the last rest of at least ``minutes`` within
+        ``[start, end)`` ends, or ``None``; gaps as in ``longest_rest``."""
+        found = None
+        current = 0
+        for code, run_start, run_end in self._runs_in(start, end):
+            length = run_end - run_start
+            if code in REST:
+                current += length
+                if current >= minutes:
+                    found = run_end
+            elif code != UNKNOWN or (max_gap is not None and length > max_gap):
+                current = 0
+        return found
+
+    def cycle_minutes(self, start_date, end_date):
+        """On-duty minutes in the range, counted from the end of the last
+        34-hour restart when there is one."""
+        start, end = self.window(start_date, end_date)
+        restart_end = self.last_rest_end(34 * 60, start, end, max_gap=1)
+        codes = self.codes[start if restart_end is None else restart_end:end]
+        return sum(codes.count(code) for code in ON_DUTY)
+
+    def has_rest(self, minutes, start_date, end_date=None, max_gap=None):
+        start, end = self.window(start_date, end_date)
+        return self.longest_rest(start, end, max_gap) >= minutes
+
+    def has_split_sleeper_rest(self, start_date, end_date=None):
+        """Split sleeper-berth pairing: a sleeper-berth period of at least
+        7 hours plus a separate rest period of at least 2 hours, together
+        at least 10 hours."""
+        start, end = self.window(start_date, end_date)
+        sleeper = []
+        periods = []  # [first minute, last minute + 1, rest minutes]
+        current = None
+        for code, run_start, run_end in self._runs_in(start, end):
+            length = run_end - run_start
+            if code == SB and length >= 7 * 60:
+                sleeper.append((run_start, length))
+            if code in REST:
+                if current is None:
+                    current = [run_start, run_end, 0]
+                    periods.append(current)
+                current[1] = run_end
+                current[2] += length
+            elif code != UNKNOWN:
+                current = None
+
+        for sleeper_start, sleeper_length in sleeper:
+            for period_start, period_end, period_length in periods:
+                contains_sleeper = period_start <= sleeper_start < period_end
+                if (not contains_sleeper and period_length >= 2 * 60
+                        and sleeper_length + period_length >= 10 * 60):
+                    return True
+        return False
+
+    def needs_30_minute_break(self, start_date, end_date=None):
+        """True when more than 8 hours of driving accumulate without a
+        non-driving interruption of at least 30 consecutive minutes."""
+        start, end = self.window(start_date, end_date)
+        driving = interruption = 0
+        for code, run_start, run_end in self._runs_in(start, end):
+            length = run_end - run_start
+            if code == D:
+                driving += length
+                interruption = 0
+                if driving > 8 * 60:
+                    return True
+            elif code != UNKNOWN:
+                interruption += length
+                if interruption >= 30:
+                    driving = 0
+        return False
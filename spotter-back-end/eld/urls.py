@@ -0,0 +1,16 @@
+from django.urls import path, re_path
+
+from .views import (DriverLogExportView, DriverLogSheetView, LogSheetFileView,
+                    PlanLogSheetsView, driver_clock_stream)
+
+urlpatterns = [
+    path('drivers/<int:driver_id>/logs/',
+         DriverLogExportView.as_view(), name='driver-log-export'),
+    path('drivers/<int:driver_id>/log-sheets/<str:day>/',
+         DriverLogSheetView.as_view(), name='driver-log-sheet'),
+    path('drivers/<int:driver_id>/clocks/stream/',
+         driver_clock_stream, name='driver-clock-stream'),
+    path('log-sheets/', PlanLogSheetsView.as_view(), name='plan-log-sheets'),
+    re_path(r'^log-sheets/(?P<token>[\w.:-]+)\.(?P<fmt>svg|pdf)$',
+            LogSheetFileView.as_view(), name='log-sheet-file'),
+]
@@ -1,3 +1,138 @@
-from django.shortcuts import render
+import os
+from datetime import date as date_cls
 
-# Create your views here.
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .archive import logs_for_driver
+from .clocks import sse_events
+from .log_sheets import (FORMATS, render_log_sheets, segments_from_logs,
+                         segments_from_plan)
+from .models import Driver
+from .serializers import PlanLogSheetsSerializer
+
+SHEET_URL_SALT = 'eld.log-sheet'
+
+
+def _cache_root():
+    return os.path.join(settings.MEDIA_ROOT, settings.LOG_SHEET_CACHE_DIR)
+
+
+def _sheet_url(header, segments, fmt):
+    # The URL carries the signed sheet itself, so any instance can render it.
+    token = signing.dumps([header, segments], salt=SHEET_URL_SALT, compress=True)
+    return reverse('log-sheet-file', args=[token, fmt])
+
+
+def _parse_date(value):
+    try:
+        return date_cls.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DriverLogSheetView(APIView):
+    """Render a driver's logged day as an SVG (default) or PDF sheet."""
+
+    def get(self, request, driver_id, day):
+        driver = get_object_or_404(Driver, pk=driver_id)
+        fmt = request.query_params.get('output', 'svg')
+        if fmt not in FORMATS:
+            return Response({'detail': f'Unsupported output: {fmt}'}, status=status.HTTP_400_BAD_REQUEST)
+        day = _parse_date(day)
+        if day is None:
+            return Response({'detail': 'Date must be YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        logs = logs_for_driver(driver, day, day)
+        header = {'date': day.isoformat(), 'driver': driver.name,
+                  'license': driver.license_number}
+        [path] = render_log_sheets(
+            [(header, segments_from_logs(logs, day))], fmt, _cache_root())
+        return FileResponse(open(path, 'rb'), content_type=FORMATS[fmt])
+
+
+class DriverLogExportView(APIView):
+    """Audit export of a driver's logs, read across hot and archived tiers."""
+
+    def get(self, request, driver_id):
+        driver = get_object_or_404(Driver, pk=driver_id)
+        start = _parse_date(request.query_params.get('start'))
+        end = _parse_date(request.query_params.get('end'))
+        if not start or not end or start > end:
+            return Response({'detail': 'start and end must be YYYY-MM-DD dates, start <= end.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        logs = logs_for_driver(driver, start, end)
+        return Response({'driver_id': driver.id, 'logs': [
+            {
+                'id': log.id,
+                'date': log.date.isoformat(),
+                'duty_status': log.duty_status,
+                'start_time': log.start_time.isoformat(),
+                'duration': log.duration,
+            }
+            for log in logs
+        ]})
+
+
+class PlanLogSheetsView(APIView):
+    """Render every day of a ``plan_trip`` result and return the sheet URLs."""
+
+    def post(self, request):
+        serializer = PlanLogSheetsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'detail': 'Invalid log sheet request.', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        fmt = data['output']
+        driver = data.get('driver') or {}
+        sheets = [
+            ({'date': plan['date'].isoformat(), 'driver': driver.get('name')},
+             segments_from_plan(plan))
+            for plan in data['plans']
+        ]
+        render_log_sheets(
+            sheets, fmt, _cache_root(),
+            max_workers=settings.LOG_SHEET_MAX_WORKERS)
+        return Response({'log_sheets': [
+            {'date': header['date'],
+             'url': request.build_absolute_uri(_sheet_url(header, segments, fmt))}
+            for header, segments in sheets
+        ]})
+
+
+class LogSheetFileView(APIView):
+    """Serve a sheet from a ``PlanLogSheetsView`` URL, rendering it again
+    when this instance's cache does not have it."""
+
+    def get(self, request, token, fmt):
+        try:
+            header, segments = signing.loads(token, salt=SHEET_URL_SALT)
+        except signing.BadSignature:
+            raise Http404('Log sheet not found.')
+        [path] = render_log_sheets([(header, segments)], fmt, _cache_root())
+        response = FileResponse(open(path, 'rb'), content_type=FORMATS[fmt])
+        # The URL names the content, so the response never changes.
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
+async def driver_clock_stream(request, driver_id):
+    """Server-Sent Events feed of a driver's remaining HOS clocks.
+
+    Replaces polling ``DriverCycleView``: an event is sent on connect and
+    whenever a new ``HOSLog`` for the driver is committed. Needs the ASGI
+    entry point, since it holds the connection open.
+    """
+    if not await Driver.objects.filter(pk=driver_id).aexists():
+        raise Http404('Driver not found.')
+    response = StreamingHttpResponse(
+        sse_events(driver_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
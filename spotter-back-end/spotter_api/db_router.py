@@ -0,0 +1,143 @@
+"""Send HOS/cycle reads to an optional read replica.
+
+Reads of ``eld`` models (drivers, HOS logs and their archives) go to the
+``HOS_READ_REPLICA`` alias when one is configured. Writing a driver's
+``HOSLog`` (routed here, or saved through the ``post_save`` receiver in
+``eld.signals``) pins that driver's reads to the primary for
+``HOS_REPLICA_STICKY_SECONDS``, so a driver never reads a replica that has
+not caught up with their own log, while every other driver keeps reading
+the replica:
+
+* within this process, through a ``{driver_id: deadline}`` map;
+* across workers, through a short-lived cookie that ``ReplicaPinMiddleware``
+  sets on the writing client's response and reads on its next requests.
+
+The driver a read belongs to comes from ``reading_driver()`` (set by the
+middleware from a view's ``driver_id`` and by the HOS read helpers) or from
+the model instance the ORM passes as a hint. Reads inside a transaction on
+the primary also stay there.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_APPS = {'eld'}
+PIN_COOKIE = 'hos_primary'
+
+# Drivers pinned for the rest of the current request; None outside the
+# middleware, so commands and workers rely on the process window alone.
+_request_pinned = ContextVar('hos_request_pinned', default=None)
+# The driver whose data the current code is reading, when known.
+_current_driver = ContextVar('hos_current_driver', default=None)
+# driver_id -> monotonic time until which this process reads it from the primary.
+_pinned_until = {}
+_lock = threading.Lock()
+
+
+def _driver_of(model, instance):
+    if instance is None:
+        return None
+    if model._meta.model_name == 'driver':
+        return instance.pk
+    return getattr(instance, 'driver_id', None)
+
+
+def pin_to_primary(driver_id):
+    """Read ``driver_id``'s data from the primary for the sticky window."""
+    request_pinned = _request_pinned.get()
+    if request_pinned is not None:
+        _request_pinned.set(request_pinned | {driver_id})
+    now = time.monotonic()
+    with _lock:
+        for expired in [key for key, until in _pinned_until.items() if until <= now]:
+            del _pinned_until[expired]
+        _pinned_until[driver_id] = now + settings.HOS_REPLICA_STICKY_SECONDS
+
+
+def is_pinned(driver_id):
+    if driver_id in (_request_pinned.get() or ()):
+        return True
+    with _lock:
+        return time.monotonic() < _pinned_until.get(driver_id, 0.0)
+
+
+@contextmanager
+def reading_driver(driver_id):
+    """Attribute HOS reads in this block to ``driver_id``."""
+    token = _current_driver.set(driver_id)
+    try:
+        yield
+    finally:
+        _current_driver.reset(token)
+
+
+class HOSReadRouter:
+    def db_for_read(self, model, **hints):
+        replica = settings.HOS_READ_REPLICA
+        if not replica or model._meta.app_label not in REPLICA_APPS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        driver_id = _driver_of(model, hints.get('instance'))
+        if driver_id is None:
+            driver_id = _current_driver.get()
+        if driver_id is not None and is_pinned(driver_id):
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        # Cache tables pass a stand-in model without ``_meta.label``.
+        if (model._meta.app_label, model._meta.model_name) == ('eld', 'hoslog'):
+            driver_id = _driver_of(model, hints.get('instance'))
+            if driver_id is None:
+                driver_id = _current_driver.get()
+            if driver_id is not None:
+                pin_to_primary(driver_id)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica receives schema changes through replication.
+        return db == DEFAULT_DB_ALIAS
+
+
+def _cookie_drivers(value):
+    return frozenset(int(part) for part in value.split(',') if part.isdigit())
+
+
+class ReplicaPinMiddleware:
+    """Scopes primary pinning to the request and carries a client's own
+    pins to whichever worker serves its next requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        carried = _cookie_drivers(request.COOKIES.get(PIN_COOKIE, ''))
+        token = _request_pinned.set(carried)
+        driver_token = _current_driver.set(None)
+        try:
+            response = self.get_response(request)
+            written = _request_pinned.get() - carried
+        finally:
+            _current_driver.reset(driver_token)
+            _request_pinned.reset(token)
+        if written:
+            response.set_cookie(
+                PIN_COOKIE, ','.join(str(driver) for driver in sorted(written | carried)),
+                max_age=max(1, round(settings.HOS_REPLICA_STICKY_SECONDS)),
+                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        driver_id = view_kwargs.get('driver_id')
+        if driver_id is not None:
+            _current_driver.set(int(driver_id))  # reset by __call__
+        return None
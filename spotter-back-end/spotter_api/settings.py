@@ -11,19 +11,19 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
-# Configure PyMySQL to be used as MySQLdb replacement
-import pymysql
-from dotenv import load_dotenv
-
-pymysql.install_as_MySQLdb()
-
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Settings are imported on every cold start, so keep them cheap: only pull in
+# python-dotenv when there is a .env file to load (serverless deployments
+# get their environment from the platform).
+if (BASE_DIR / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -61,6 +61,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'spotter_api.simple_options_middleware.SimpleOptionsMiddleware',
+    'spotter_api.db_router.ReplicaPinMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -94,9 +95,18 @@ WSGI_APPLICATION = 'spotter_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+_DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.mysql')
+if _DB_ENGINE == 'django.db.backends.mysql':
+    # Use PyMySQL as the MySQLdb driver. Django loads the backend during
+    # setup, so this is on the startup path either way.
+    import pymysql
+
+    pymysql.install_as_MySQLdb()
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # Override with DB_ENGINE=django.db.backends.sqlite3 to run tests locally
+        'ENGINE': _DB_ENGINE,
         'NAME': os.getenv('DB_NAME'),  # Set to your database name
         'USER': os.getenv('DB_USER'),  # Set to your database user
         # Set to your database password
@@ -105,8 +115,83 @@ DATABASES = {
         'HOST': os.getenv('DB_HOST'),
         # Set to the MySQL server's port, if different from the default (3306)
         'PORT': os.getenv('DB_PORT'),
+        # Keep connections open across requests instead of reconnecting every
+        # time; health checks replace connections the server has dropped.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+if _DB_ENGINE == 'django.db.backends.sqlite3':
+    # SQLite ignores SELECT ... FOR UPDATE; take the write lock when a
+    # transaction begins so concurrent rate-limit updates queue on the busy
+    # timeout instead of failing with "database is locked".
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+
+# Optional read replica for HOS/cycle reads (see spotter_api.db_router). Set
+# DB_REPLICA_HOST and/or DB_REPLICA_NAME; other credentials default to the
+# primary's.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+HOS_READ_REPLICA = 'replica' if 'replica' in DATABASES else None
+# After a HOS write, this process keeps reading HOS data from the primary for
+# this long so replication lag never hides a driver's own log.
+HOS_REPLICA_STICKY_SECONDS = float(os.getenv('HOS_REPLICA_STICKY_SECONDS', '5'))
+DATABASE_ROUTERS = ['spotter_api.db_router.HOSReadRouter']
+
+# Upstream services. Override to use self-hosted instances (or the local
+# stand-ins in benchmarks.upstreams).
+NOMINATIM_DOMAIN = os.getenv('NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org')
+NOMINATIM_SCHEME = os.getenv('NOMINATIM_SCHEME', 'https')
+OPENROUTESERVICE_BASE_URL = os.getenv('OPENROUTESERVICE_BASE_URL', 'https://api.openrouteservice.org')
+
+# Shared token buckets for outbound calls (see trips.rate_limits): `rate` is
+# requests per second, `burst` the bucket size. Plan requests queue for at
+# most UPSTREAM_MAX_WAIT_SECONDS before failing with a 503.
+UPSTREAM_RATE_LIMITS = {
+    'nominatim': {
+        'rate': float(os.getenv('NOMINATIM_RATE_PER_SECOND', '1')),
+        'burst': float(os.getenv('NOMINATIM_BURST', '1')),
+    },
+    'openrouteservice': {
+        'rate': float(os.getenv('OPENROUTESERVICE_RATE_PER_MINUTE', '40')) / 60,
+        'burst': float(os.getenv('OPENROUTESERVICE_BURST', '5')),
+    },
+}
+UPSTREAM_MAX_WAIT_SECONDS = float(os.getenv('UPSTREAM_MAX_WAIT_SECONDS', '10'))
+
+# Caches
+# The planning cache holds geocoding and routing results shared by all
+# workers; create its table with `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'planning': {
+        'BACKEND': os.getenv('PLANNING_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('PLANNING_CACHE_LOCATION', 'planning_cache'),
+    },
+}
+
+GEOCODE_CACHE_TIMEOUT = 30 * 24 * 3600  # addresses rarely move
+ROUTE_CACHE_TIMEOUT = 7 * 24 * 3600
+
+# Truck stops for fuel and rest locations, built with
+# `python manage.py build_truck_stop_index stops.csv`. The index is
+# memory-mapped, so all workers on a host share one copy. Without it, stops
+# keep their placeholder names.
+TRUCK_STOP_INDEX = os.getenv('TRUCK_STOP_INDEX', os.path.join(BASE_DIR, 'data', 'truck_stops.idx'))
+TRUCK_STOP_CORRIDOR_MILES = float(os.getenv('TRUCK_STOP_CORRIDOR_MILES', '10'))
+TRUCK_STOP_SEARCH_BACK_MILES = float(os.getenv('TRUCK_STOP_SEARCH_BACK_MILES', '150'))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -161,7 +246,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Media (for generated log sheet PDFs)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# The deployed filesystem is read-only apart from the temp dir; point
+# MEDIA_ROOT at persistent storage to keep the cache across instances.
+MEDIA_ROOT = os.getenv(
+    'MEDIA_ROOT', os.path.join(tempfile.gettempdir(), 'spotter-media'))
+
+# Rendered daily log sheets are cached under MEDIA_ROOT keyed by a hash of the
+# day's duty segments; multi-day bundles render across this many processes.
+# Serverless functions (Vercel runs on AWS Lambda) render serially.
+LOG_SHEET_CACHE_DIR = 'log_sheets'
+_SERVERLESS = bool(os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME'))
+LOG_SHEET_MAX_WORKERS = int(
+    os.getenv('LOG_SHEET_MAX_WORKERS', '1' if _SERVERLESS else '4'))
+
+# Live HOS clock push: subscribers get a keep-alive (and a re-read of the
+# clocks, once per driver) after this many idle seconds.
+HOS_CLOCK_RESYNC_SECONDS = int(os.getenv('HOS_CLOCK_RESYNC_SECONDS', '30'))
+
+# HOS logs dated more than this many days ago are moved to compressed monthly
+# archives by `manage.py archive_hos_logs`.
+HOS_ARCHIVE_AFTER_DAYS = int(os.getenv('HOS_ARCHIVE_AFTER_DAYS', '90'))
 
 # CORS settings for frontend communication
 # IMPORTANT: Do NOT include trailing slashes in origins
@@ -0,0 +1,157 @@
+from datetime import date
+from unittest import SkipTest, mock, skipUnless
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from benchmarks import import_time
+from eld import archive
+from eld.models import Driver, HOSLog
+from trips.models import Trip
+
+from . import db_router
+
+
+class ColdStartTests(SimpleTestCase):
+    def test_heavy_dependencies_are_imported_lazily(self):
+        try:
+            _elapsed, modules = import_time.measure()
+        except OSError as e:
+            raise SkipTest(f"Cannot start a subprocess: {e}")
+        lazy = import_time.load_budget()['lazy_modules']
+        self.assertEqual(sorted(set(lazy) & modules), [])
+
+
+@override_settings(HOS_READ_REPLICA='replica', HOS_REPLICA_STICKY_SECONDS=5)
+class HOSReadRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_router.HOSReadRouter()
+        patcher = mock.patch.dict(db_router._pinned_until, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token = db_router._request_pinned.set(frozenset())
+        self.addCleanup(db_router._request_pinned.reset, token)
+
+    def read_for(self, driver_id):
+        with db_router.reading_driver(driver_id):
+            return self.router.db_for_read(HOSLog)
+
+    def test_hos_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(HOSLog), 'replica')
+        self.assertEqual(self.router.db_for_read(Driver), 'replica')
+        self.assertIsNone(self.router.db_for_read(Trip))
+        self.assertFalse(self.router.allow_migrate('replica', 'eld'))
+
+    @override_settings(HOS_READ_REPLICA=None)
+    def test_no_replica_configured(self):
+        self.assertIsNone(self.router.db_for_read(HOSLog))
+
+    def test_log_write_pins_only_that_driver(self):
+        self.assertEqual(
+            self.router.db_for_write(HOSLog, instance=HOSLog(driver_id=1)), 'default')
+        self.assertEqual(self.read_for(1), 'default')
+        self.assertEqual(
+            self.router.db_for_read(HOSLog, instance=HOSLog(driver_id=1)), 'default')
+        self.assertEqual(self.router.db_for_read(Driver, instance=Driver(pk=1)), 'default')
+        self.assertEqual(self.read_for(2), 'replica')
+        self.assertEqual(self.router.db_for_read(HOSLog), 'replica')
+
+        # Later requests in this process keep driver 1 on the primary for the window.
+        db_router._request_pinned.set(None)
+        self.assertEqual(self.read_for(1), 'default')
+        with mock.patch('time.monotonic', return_value=db_router._pinned_until[1] + 1):
+            self.assertEqual(self.read_for(1), 'replica')
+
+    def test_other_eld_writes_do_not_pin(self):
+        self.router.db_for_write(Driver, instance=Driver(pk=1))
+        self.router.db_for_write(HOSLog)  # driver unknown
+        self.assertEqual(self.read_for(1), 'replica')
+        self.assertEqual(db_router._pinned_until, {})
+
+    def test_middleware_carries_pins_in_a_cookie(self):
+        seen = {}
+
+        def view(request):
+            db_router.HOSReadRouter().db_for_write(HOSLog, instance=HOSLog(driver_id=3))
+            return HttpResponse('ok')
+
+        def other_worker(request):
+            seen.update({driver: db_router.is_pinned(driver) for driver in (3, 4)})
+            return HttpResponse('ok')
+
+        response = db_router.ReplicaPinMiddleware(view)(RequestFactory().get('/'))
+        cookie = response.cookies[db_router.PIN_COOKIE]
+        self.assertEqual(cookie.value, '3')
+        self.assertEqual(db_router._request_pinned.get(), frozenset())
+
+        db_router._pinned_until.clear()  # as seen from another process
+        request = RequestFactory().get('/')
+        request.COOKIES[db_router.PIN_COOKIE] = cookie.value
+        response = db_router.ReplicaPinMiddleware(other_worker)(request)
+        self.assertEqual(seen, {3: True, 4: False})
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_pins_outside_a_request_use_the_window_only(self):
+        db_router._request_pinned.set(None)
+        db_router.pin_to_primary(6)
+        self.assertIsNone(db_router._request_pinned.get())
+        self.assertTrue(db_router.is_pinned(6))
+
+    def test_view_driver_id_scopes_reads(self):
+        db_router.pin_to_primary(5)
+        db_router._request_pinned.set(frozenset())
+        middleware = db_router.ReplicaPinMiddleware(lambda request: HttpResponse())
+
+        def view(request):
+            middleware.process_view(request, None, (), {'driver_id': '5'})
+            return HttpResponse(self.router.db_for_read(Driver))
+
+        middleware.get_response = view
+        self.assertEqual(middleware(RequestFactory().get('/')).content, b'default')
+        self.assertIsNone(db_router._current_driver.get())
+
+
+@skipUnless(settings.HOS_READ_REPLICA, "set DB_REPLICA_NAME to test against a replica alias")
+class ReplicaRoutingTests(TransactionTestCase):
+    # TransactionTestCase: reads inside the primary's transaction stay there.
+    databases = {'default', settings.HOS_READ_REPLICA or 'default'}
+
+    def setUp(self):
+        patcher = mock.patch.dict(db_router._pinned_until, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def replica_reads(self, driver):
+        url = reverse('driver-cycle', args=[driver.id])
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(url)
+        self.assertEqual(response.json()['used_minutes'], driver.current_cycle_hours)
+        return len(replica_queries)
+
+    def test_cycle_view_reads_replica(self):
+        driver = Driver.objects.create(name='Ann', license_number='L1', current_cycle_hours=60)
+        self.assertEqual(self.replica_reads(driver), 1)
+
+    def test_log_write_for_one_driver_leaves_others_on_replica(self):
+        ann = Driver.objects.create(name='Ann', license_number='L1', current_cycle_hours=60)
+        bob = Driver.objects.create(name='Bob', license_number='L2', current_cycle_hours=30)
+        HOSLog.objects.create(driver=ann, date='2025-01-01', duty_status='D',
+                              start_time='2025-01-01T08:00:00Z', duration=60)
+        self.assertEqual(self.replica_reads(ann), 0)
+        self.assertEqual(self.replica_reads(bob), 1)
+
+    def test_archiving_reads_only_the_primary(self):
+        ann = Driver.objects.create(name='Ann', license_number='L1', current_cycle_hours=0)
+        for day in (1, 2, 3):
+            HOSLog.objects.create(driver=ann, date=f'2025-01-0{day}', duty_status='D',
+                                  start_time=f'2025-01-0{day}T08:00:00Z', duration=60)
+        db_router._pinned_until.clear()
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(archive.archive_logs_before(date(2025, 1, 3)), (2, 1))
+        self.assertEqual(len(replica_queries), 0)
+        self.assertEqual(HOSLog.objects.count(), 1)
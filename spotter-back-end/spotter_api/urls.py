@@ -26,5 +26,6 @@ def health(_request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/trips/', include('trips.urls')),
+    path('api/eld/', include('eld.urls')),
     path('api/health/', health, name='health'),
 ]
@@ -0,0 +1,59 @@
+"""Shared cache for upstream geocoding and routing results.
+
+Uses the ``planning`` cache alias (database-backed by default so every
+worker and serverless instance shares it). Cache failures are logged and
+treated as misses: planning must keep working without it.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches['planning']
+
+
+def geocode_cache_key(address):
+    normalized = ' '.join(address.lower().split())
+    return 'geocode:' + hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def route_cache_key(coordinates, profile='driving-car'):
+    # ~1 m precision; tiny float noise in stored coordinates still hits.
+    points = ';'.join(f"{lng:.5f},{lat:.5f}" for lng, lat in coordinates)
+    return f'route:{profile}:' + hashlib.sha256(points.encode()).hexdigest()
+
+
+def cache_get(key):
+    try:
+        return _cache().get(key)
+    except Exception as e:
+        logger.warning(f"Planning cache read failed for '{key}': {e}")
+        return None
+
+
+def cache_set(key, value, timeout):
+    try:
+        _cache().set(key, value, timeout)
+    except Exception as e:
+        logger.warning(f"Planning cache write failed for '{key}': {e}")
+
+
+def get_cached_geocode(address):
+    return cache_get(geocode_cache_key(address))
+
+
+def set_cached_geocode(address, coords):
+    cache_set(geocode_cache_key(address), coords, settings.GEOCODE_CACHE_TIMEOUT)
+
+
+def get_cached_route(coordinates):
+    return cache_get(route_cache_key(coordinates))
+
+
+def set_cached_route(coordinates, route):
+    cache_set(route_cache_key(coordinates), route, settings.ROUTE_CACHE_TIMEOUT)
@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from trips.truck_stops import TruckStopIndex, build_index, get_index, read_csv
+
+
+class Command(BaseCommand):
+    help = ("Build the memory-mapped truck stop index used to place fuel and "
+            "rest stops from a CSV of name,latitude,longitude,kind[,city,state].")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help="Truck stop / fuel station CSV.")
+        parser.add_argument(
+            '--output', default=settings.TRUCK_STOP_INDEX,
+            help="Index file to write (default: TRUCK_STOP_INDEX).")
+        parser.add_argument(
+            '--cell-degrees', type=float, default=0.5,
+            help="Grid cell size in degrees (default: 0.5, about 35 miles).")
+
+    def handle(self, *args, **options):
+        try:
+            data = build_index(read_csv(options['csv']), options['cell_degrees'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        output = options['output']
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        # Write beside the target and rename, so workers that have the old
+        # index mapped keep reading a consistent file.
+        temporary = f"{output}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(data)
+        os.replace(temporary, output)
+        get_index.cache_clear()
+
+        index = TruckStopIndex.open(output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index)} stops into {output} ({len(data)} bytes)."))
@@ -0,0 +1,147 @@
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from trips.cache import get_cached_geocode, get_cached_route
+from trips.models import Trip
+from trips.planner import geocode_address, get_coordinates
+from trips.rate_limits import batch_priority
+from trips.routes import get_route
+
+LANE_FIELDS = ('origin', 'pickup_location', 'destination')
+
+
+class Command(BaseCommand):
+    help = ("Pre-resolve geocodes and routes for known lanes so the first "
+            "planning requests after a deploy or cache flush are served from cache.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', help="CSV (with origin,pickup_location,destination columns) or JSON list of lanes.")
+        parser.add_argument(
+            '--recent', type=int, default=0,
+            help="Also warm the lanes of the N most recent trips.")
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help="Maximum upstream requests in flight (default: 4).")
+        parser.add_argument(
+            '--strict', action='store_true',
+            help="Exit with an error if any lane could not be warmed.")
+
+    def handle(self, *args, **options):
+        lanes = self.load_lanes(options['file'], options['recent'])
+        if not lanes:
+            raise CommandError("No lanes to warm; pass --file and/or --recent.")
+        self.stdout.write(f"Warming {len(lanes)} lanes...")
+
+        started = time.monotonic()
+        self.concurrency = max(1, options['concurrency'])
+        geocodes = self.warm_geocodes(lanes)
+        routes = self.warm_routes(lanes)
+        elapsed = time.monotonic() - started
+
+        fetched = geocodes['fetched'] + routes['fetched']
+        failed = geocodes['failed'] + routes['failed']
+        for name, stats in (('Geocodes', geocodes), ('Routes', routes)):
+            self.stdout.write(
+                f"{name}: {stats['fetched']} fetched, {stats['cached']} already cached, "
+                f"{stats['failed']} failed")
+        self.stdout.write(
+            f"Done in {elapsed:.1f}s ({fetched / elapsed if elapsed else 0:.2f} upstream requests/s).")
+
+        if failed:
+            message = f"{failed} lookups failed."
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("All lanes warmed."))
+
+    def load_lanes(self, path, recent):
+        lanes = []
+        if path:
+            try:
+                with open(path, newline='') as handle:
+                    if path.endswith('.json'):
+                        rows = json.load(handle)
+                    else:
+                        rows = list(csv.DictReader(handle))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read lanes from {path}: {e}")
+            for number, row in enumerate(rows, 1):
+                if not all(row.get(field) for field in LANE_FIELDS):
+                    raise CommandError(
+                        f"Lane {number} in {path} needs {', '.join(LANE_FIELDS)}.")
+                lanes.append(Trip(**{field: row[field] for field in LANE_FIELDS}))
+        if recent:
+            lanes.extend(Trip.objects.order_by('-id')[:recent])
+
+        unique = {}
+        for lane in lanes:
+            unique.setdefault(tuple(getattr(lane, field) for field in LANE_FIELDS), lane)
+        return list(unique.values())
+
+    def run_parallel(self, label, items, work):
+        """Run ``work(item) -> 'fetched' | 'cached' | 'failed'`` with bounded
+        parallelism, printing progress; returns a count per outcome.
+
+        Upstream calls run at batch priority: they share the configured rate
+        limits with live plan requests but only use capacity those leave.
+        """
+        stats = {'fetched': 0, 'cached': 0, 'failed': 0}
+
+        def run(item):
+            try:
+                with batch_priority():
+                    return work(item)
+            finally:
+                connections.close_all()  # per-thread cache connections
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(run, item): name for name, item in items}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = f'failed ({e})'
+                stats[outcome.split(' ')[0]] += 1
+                self.stdout.write(f"[{label} {done}/{len(futures)}] {outcome}: {futures[future]}")
+        return stats
+
+    def warm_geocodes(self, lanes):
+        addresses = {
+            address
+            for lane in lanes
+            for address, known in (
+                (lane.origin, lane.origin_lat and lane.origin_long),
+                (lane.pickup_location, lane.pickup_lat and lane.pickup_long),
+                (lane.destination, lane.dropoff_lat and lane.dropoff_long),
+            )
+            if not known
+        }
+
+        def work(address):
+            if get_cached_geocode(address):
+                return 'cached'
+            lat, lng = geocode_address(address)
+            return 'fetched' if lat and lng else 'failed (not found)'
+
+        return self.run_parallel(
+            'geocode', [(address, address) for address in sorted(addresses)], work)
+
+    def warm_routes(self, lanes):
+        def work(lane):
+            # Every address was geocoded above, so this is served from cache.
+            coordinates = get_coordinates(lane)
+            if get_cached_route(coordinates) is not None:
+                return 'cached'
+            get_route(coordinates)
+            return 'fetched'
+
+        return self.run_parallel(
+            'route', [(f"{lane.origin} -> {lane.pickup_location} -> {lane.destination}", lane)
+                      for lane in lanes], work)
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='total_distance_miles',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='total_driving_hours',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('driving_hours', models.FloatField()),
+                ('on_duty_hours', models.FloatField()),
+                ('off_duty_hours', models.FloatField()),
+                ('status', models.CharField(max_length=20)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_plans', to='trips.trip')),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0002_daily_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fuelstop',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fuelstop',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reststop',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reststop',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
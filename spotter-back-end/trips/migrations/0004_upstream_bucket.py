@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0003_truck_stop_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpstreamBucket',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.FloatField()),
+            ],
+        ),
+    ]
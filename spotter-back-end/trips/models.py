@@ -12,6 +12,8 @@ class Trip(models.Model):
     pickup_long = models.FloatField(null=True, blank=True)
     dropoff_lat = models.FloatField(null=True, blank=True)
     dropoff_long = models.FloatField(null=True, blank=True)
+    total_distance_miles = models.FloatField(null=True, blank=True)
+    total_driving_hours = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.origin} to {self.destination} ({self.estimated_duration} mins)"
@@ -32,6 +34,8 @@ class RouteSegment(models.Model):
 class FuelStop(models.Model):
     location = models.CharField(max_length=100)
     fuel_amount = models.FloatField()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     trip = models.ForeignKey(
         Trip, related_name='fuel_stops', on_delete=models.CASCADE)
 
@@ -43,8 +47,37 @@ class RestStop(models.Model):
     location = models.CharField(max_length=100)
     duration = models.IntegerField()
     reason = models.CharField(max_length=255, blank=True, null=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     trip = models.ForeignKey(
         Trip, related_name='rest_stops', on_delete=models.CASCADE)
 
     def __str__(self):
         return f"Rest Stop at {self.location} ({self.duration} mins)"
+
+
+class DailyPlan(models.Model):
+    trip = models.ForeignKey(
+        Trip, related_name='daily_plans', on_delete=models.CASCADE)
+    date = models.DateField()
+    driving_hours = models.FloatField()
+    on_duty_hours = models.FloatField()
+    off_duty_hours = models.FloatField()
+    status = models.CharField(max_length=20)
+    errors = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"Plan for {self.date} ({self.driving_hours} h driving)"
+
+
+class UpstreamBucket(models.Model):
+    """Shared token bucket for one rate-limited upstream (see ``trips.rate_limits``)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField()  # negative while callers are queued
+    updated_at = models.FloatField()  # Unix time of the last refill
+
+    def __str__(self):
+        return f"{self.name} ({self.tokens:.2f} tokens)"
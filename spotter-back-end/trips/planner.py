@@ -1,23 +1,53 @@
 import logging
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import accumulate
 
-from geopy.exc import GeocoderServiceError, GeocoderTimedOut
-from geopy.geocoders import Nominatim
+from django.conf import settings
+from django.db import transaction
 
+from trips.cache import get_cached_geocode, set_cached_geocode
+from trips.models import DailyPlan, FuelStop, RestStop, RouteSegment
+from trips.rate_limits import UpstreamBusy, acquire, backoff
 from trips.routes import get_route
+from trips.truck_stops import FUEL, REST, stops_along_route
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _geolocator():
+    # geopy is only needed on a cache miss; keep it off the cold-start path.
+    from geopy.geocoders import Nominatim
+
+    return Nominatim(user_agent="spotter-eld-app",
+                     domain=settings.NOMINATIM_DOMAIN,
+                     scheme=settings.NOMINATIM_SCHEME)
+
+
 def geocode_address(address):
     if not address:
         return None, None
 
+    cached = get_cached_geocode(address)
+    if cached:
+        return tuple(cached)
+
+    from geopy.exc import (GeocoderRateLimited, GeocoderServiceError,
+                           GeocoderTimedOut)
+
+    acquire('nominatim')
     try:
-        geolocator = Nominatim(user_agent="spotter-eld-app")
-        location = geolocator.geocode(address, timeout=10)
+        location = _geolocator().geocode(address, timeout=10)
         if location:
-            return location.latitude, location.longitude
+            coords = (location.latitude, location.longitude)
+            set_cached_geocode(address, coords)
+            return coords
+        return None, None
+    except GeocoderRateLimited as e:
+        # Hold every worker off, not just this one.
+        backoff('nominatim', e.retry_after or 60)
+        logger.warning(f"Geocoding rate limited for '{address}': {e}")
         return None, None
     except (GeocoderTimedOut, GeocoderServiceError) as e:
         logger.warning(f"Geocoding failed for '{address}': {e}")
@@ -58,8 +88,15 @@ def get_coordinates(trip):
     return [origin_coords, pickup_coords, dropoff_coords]
 
 
+def _located(stop):
+    """Model fields for a stop found in the truck stop index."""
+    return {'location': stop.name[:100], 'latitude': stop.latitude,
+            'longitude': stop.longitude}
+
+
 def calculate_fuel_stops(total_distance_miles, route_coordinates):
-    """Calculate fuel stops every 1000 miles along the route."""
+    """Calculate fuel stops every 1000 miles along the route, at the nearest
+    indexed fuel station when a truck stop index is available."""
     fuel_stops = []
     if total_distance_miles > 1000:
         num_stops = int(total_distance_miles // 1000)
@@ -70,9 +107,96 @@ def calculate_fuel_stops(total_distance_miles, route_coordinates):
                 'location': f"Fuel Stop {i} (approx {stop_distance} miles)",
                 'fuel_amount': 200  # gallons, typical truck tank
             })
+    located = stops_along_route(
+        route_coordinates, [stop['distance_from_start'] for stop in fuel_stops],
+        FUEL, total_distance_miles)
+    for stop, found in zip(fuel_stops, located or []):
+        if found:
+            stop.update(_located(found), distance_from_start=found.distance_from_start,
+                        off_route_miles=found.off_route_miles)
     return fuel_stops
 
 
+def build_route_segments(trip, segments):
+    """Describe each routed leg (origin->pickup, pickup->dropoff)."""
+    stops = [trip.origin, trip.pickup_location, trip.destination]
+    return [
+        {
+            'start_point': stops[i],
+            'end_point': stops[i + 1],
+            'distance': round(seg['distance'] / 1000, 1),  # km
+            'driving_time': round(seg['duration'] / 60),  # minutes
+        }
+        for i, seg in enumerate(segments[:len(stops) - 1])
+    ]
+
+
+def build_rest_stops(plans, route_coordinates=None, total_distance_miles=None):
+    """A 10-hour off-duty break closes every day except the last, at the
+    nearest indexed truck stop to where that day's driving ends."""
+    rest_stops = [
+        {
+            'location': f"End of day {i} ({plan['date']})",
+            'duration': 600,
+            'reason': '10-hour off-duty break',
+        }
+        for i, plan in enumerate(plans[:-1], 1)
+    ]
+    driven = list(accumulate(plan['driving_hours'] for plan in plans))
+    if rest_stops and total_distance_miles and driven[-1]:
+        located = stops_along_route(
+            route_coordinates,
+            [total_distance_miles * hours / driven[-1] for hours in driven[:-1]],
+            REST, total_distance_miles)
+        for stop, found in zip(rest_stops, located or []):
+            if found:
+                stop.update(_located(found))
+    return rest_stops
+
+
+def save_plan_result(trip, result):
+    """Save the newly planned ``trip`` with its ``plan_trip`` result.
+
+    The summary and coordinates are set on ``trip`` before it is saved, so
+    a new trip costs one insert plus (at most) one bulk insert per related
+    table, regardless of plan length. Rows are only added: a trip is
+    planned once, so there is nothing to replace.
+    """
+    summary = result['summary']
+    (origin_long, origin_lat), (pickup_long, pickup_lat), (dropoff_long, dropoff_lat) = \
+        summary['coordinates']
+    related = [
+        (RouteSegment, [RouteSegment(trip=trip, **seg)
+                        for seg in result.get('route_segments', [])]),
+        (FuelStop, [FuelStop(trip=trip, location=stop['location'],
+                             fuel_amount=stop['fuel_amount'],
+                             latitude=stop.get('latitude'),
+                             longitude=stop.get('longitude'))
+                    for stop in result.get('fuel_stops', [])]),
+        (RestStop, [RestStop(trip=trip, **stop)
+                    for stop in result.get('rest_stops', [])]),
+        (DailyPlan, [DailyPlan(trip=trip, date=plan['date'],
+                               driving_hours=plan['driving_hours'],
+                               on_duty_hours=plan['on_duty_hours'],
+                               off_duty_hours=plan['off_duty_hours'],
+                               status=plan['status'],
+                               errors=plan.get('errors', []))
+                     for plan in result['plans']]),
+    ]
+
+    trip.total_distance_miles = summary['total_distance_miles']
+    trip.total_driving_hours = summary['total_driving_hours']
+    trip.origin_lat, trip.origin_long = origin_lat, origin_long
+    trip.pickup_lat, trip.pickup_long = pickup_lat, pickup_long
+    trip.dropoff_lat, trip.dropoff_long = dropoff_lat, dropoff_long
+
+    with transaction.atomic():
+        trip.save()
+        for model, rows in related:
+            if rows:
+                model.objects.bulk_create(rows)
+
+
 def plan_trip(driver, trip):
     """Enhanced trip planner with geocoding and improved HOS logic."""
     try:
@@ -84,12 +208,14 @@ def plan_trip(driver, trip):
                 "Unable to calculate route - no routing data returned")
 
         segments = route['features'][0]['properties']['segments']
+        # Fall back to straight lines between the stops without geometry.
+        geometry = route['features'][0].get('geometry', {}).get('coordinates') or coordinates
         total_distance_meters = sum(seg['distance'] for seg in segments)
         total_distance_miles = total_distance_meters / 1609.34
         total_duration_seconds = sum(seg['duration'] for seg in segments)
         total_driving_hours = total_duration_seconds / 3600
 
-        fuel_stops = calculate_fuel_stops(total_distance_miles, coordinates)
+        fuel_stops = calculate_fuel_stops(total_distance_miles, geometry)
 
         plans = []
         current_date = datetime.now().date()
@@ -152,9 +278,13 @@ def plan_trip(driver, trip):
         return {
             'plans': plans,
             'summary': trip_summary,
-            'fuel_stops': fuel_stops
+            'fuel_stops': fuel_stops,
+            'route_segments': build_route_segments(trip, segments),
+            'rest_stops': build_rest_stops(plans, geometry, total_distance_miles),
         }
 
+    except UpstreamBusy:
+        raise
     except Exception as e:
         logger.error(f"Trip planning failed: {str(e)}")
         return {
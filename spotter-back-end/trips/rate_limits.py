@@ -0,0 +1,181 @@
+"""Shared rate limits for outbound geocoding and routing calls.
+
+Each upstream in ``UPSTREAM_RATE_LIMITS`` has one token bucket stored in
+the database (``UpstreamBucket``), so every thread, worker and serverless
+instance draws from the same budget. A caller reserves a token in a short
+locked transaction and then sleeps until its slot comes up; the balance
+goes negative while callers are queued, which keeps the queue FIFO across
+processes and lets the wait be computed up front.
+
+Interactive callers (plan requests, the default) queue for at most
+``UPSTREAM_MAX_WAIT_SECONDS`` and otherwise get ``UpstreamBusy`` straight
+away. Batch callers (``with batch_priority():``, used by warm-up) never
+queue: they only take a token that is free right now and otherwise back
+off, so they get whatever capacity interactive traffic leaves over.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import UpstreamBucket
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+_priority = contextvars.ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+class UpstreamBusy(Exception):
+    """The upstream's queue is longer than the caller may wait."""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"{name} is rate limited; retry in {math.ceil(retry_after)}s")
+
+
+@contextmanager
+def batch_priority():
+    """Run upstream calls in this block (and thread) as batch traffic."""
+    token = _priority.set(BATCH)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Stats:
+    """Per-process counters behind ``upstream_status``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.upstreams = {}
+
+    def get(self, name):
+        return self.upstreams.setdefault(name, {
+            'waiting': {INTERACTIVE: 0, BATCH: 0},
+            'granted': 0,
+            'rejected': 0,
+            'wait_seconds': 0.0,
+        })
+
+    def update(self, name, **changes):
+        with self.lock:
+            stats = self.get(name)
+            for key, value in changes.items():
+                if key in (INTERACTIVE, BATCH):
+                    stats['waiting'][key] += value
+                else:
+                    stats[key] += value
+
+
+_stats = _Stats()
+
+
+def _limit(name):
+    limit = settings.UPSTREAM_RATE_LIMITS.get(name)
+    return (limit['rate'], limit['burst']) if limit else None
+
+
+def _refilled(bucket, rate, burst, now):
+    return min(burst, bucket.tokens + max(0.0, now - bucket.updated_at) * rate)
+
+
+def _reserve(name, rate, burst, priority, max_wait):
+    """Take a token and return how long to sleep before using it, or return
+    ``(None, hint)`` when a batch caller should back off for ``hint``."""
+    with transaction.atomic():
+        now = time.time()
+        bucket, _ = UpstreamBucket.objects.select_for_update().get_or_create(
+            name=name, defaults={'tokens': burst, 'updated_at': now})
+        tokens = _refilled(bucket, rate, burst, now)
+        wait = max(0.0, (1 - tokens) / rate)
+        if priority == BATCH and wait > 0:
+            return None, wait
+        if wait > max_wait:
+            raise UpstreamBusy(name, wait)
+        bucket.tokens = tokens - 1
+        bucket.updated_at = now
+        bucket.save(update_fields=['tokens', 'updated_at'])
+        return wait, None
+
+
+def acquire(name, max_wait=None):
+    """Block until a call to upstream ``name`` may be made.
+
+    Returns the seconds spent waiting. Upstreams without a configured
+    limit are not throttled.
+    """
+    limit = _limit(name)
+    if limit is None:
+        return 0.0
+    rate, burst = limit
+    priority = _priority.get()
+    if max_wait is None:
+        max_wait = settings.UPSTREAM_MAX_WAIT_SECONDS
+
+    waited = 0.0
+    _stats.update(name, **{priority: 1})
+    try:
+        while True:
+            try:
+                wait, backoff = _reserve(name, rate, burst, priority, max_wait)
+            except UpstreamBusy:
+                _stats.update(name, rejected=1)
+                raise
+            if wait is not None:
+                time.sleep(wait)
+                waited += wait
+                break
+            time.sleep(backoff)
+            waited += backoff
+    finally:
+        _stats.update(name, **{priority: -1})
+    _stats.update(name, granted=1, wait_seconds=waited)
+    return waited
+
+
+def backoff(name, seconds):
+    """Hold every caller of ``name`` off for ``seconds`` (after a 429)."""
+    limit = _limit(name)
+    if limit is None:
+        return
+    rate, burst = limit
+    with transaction.atomic():
+        now = time.time()
+        bucket, _ = UpstreamBucket.objects.select_for_update().get_or_create(
+            name=name, defaults={'tokens': burst, 'updated_at': now})
+        bucket.tokens = min(_refilled(bucket, rate, burst, now), 1 - seconds * rate)
+        bucket.updated_at = now
+        bucket.save(update_fields=['tokens', 'updated_at'])
+
+
+def upstream_status():
+    """Limits, shared queue depth and this process's counters per upstream."""
+    now = time.time()
+    buckets = {bucket.name: bucket for bucket in UpstreamBucket.objects.all()}
+    status = []
+    for name, limit in settings.UPSTREAM_RATE_LIMITS.items():
+        bucket = buckets.get(name)
+        tokens = (_refilled(bucket, limit['rate'], limit['burst'], now)
+                  if bucket else limit['burst'])
+        with _stats.lock:
+            local = _stats.get(name)
+            local = dict(local, waiting=dict(local['waiting']))
+        status.append({
+            'name': name,
+            'rate_per_second': limit['rate'],
+            'burst': limit['burst'],
+            'tokens': round(max(tokens, 0.0), 2),
+            # Reservations not yet due, across all processes.
+            'queued': max(0, math.ceil(-tokens)),
+            'queue_seconds': round(max(0.0, -tokens) / limit['rate'], 2),
+            'process': dict(local, wait_seconds=round(local['wait_seconds'], 3)),
+        })
+    return status
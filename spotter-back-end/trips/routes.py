@@ -1,25 +1,41 @@
 import os
+from functools import lru_cache
 
-import openrouteservice
-from dotenv import load_dotenv
+from django.conf import settings
 
-load_dotenv()
+from trips.cache import get_cached_route, set_cached_route
+from trips.rate_limits import acquire
 
-API_KEY = os.getenv('OPENROUTESERVICE_API_KEY')
+
+@lru_cache(maxsize=None)
+def _client():
+    # Built on first use and then reused: openrouteservice (and requests) are
+    # only needed on a cache miss, not at process start.
+    import openrouteservice
+
+    return openrouteservice.Client(key=os.getenv('OPENROUTESERVICE_API_KEY'),
+                                   base_url=settings.OPENROUTESERVICE_BASE_URL)
 
 
 def get_route(coordinates):
-    client = openrouteservice.Client(key=API_KEY)
+    route = get_cached_route(coordinates)
+    if route is not None:
+        return route
+
+    client = _client()
+    acquire('openrouteservice')
     route = client.directions(
         coordinates=coordinates,
         profile='driving-car',
         format='geojson'
     )
+    set_cached_route(coordinates, route)
     return route
 
 
 def get_distance_matrix(locations):
-    client = openrouteservice.Client(key=API_KEY)
+    client = _client()
+    acquire('openrouteservice')
     matrix = client.distance_matrix(
         locations=locations,
         profile='driving-car',
@@ -1,7 +1,7 @@
 from eld.models import Driver
 from rest_framework import serializers
 
-from .models import Trip
+from .models import DailyPlan, FuelStop, RestStop, RouteSegment, Trip
 
 
 class TripSerializer(serializers.ModelSerializer):
@@ -14,3 +14,48 @@ class DriverSerializer(serializers.ModelSerializer):
     class Meta:
         model = Driver
         fields = '__all__'
+
+
+class RouteSegmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RouteSegment
+        fields = ('id', 'start_point', 'end_point', 'distance', 'driving_time')
+
+
+class FuelStopSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FuelStop
+        fields = ('id', 'location', 'fuel_amount', 'latitude', 'longitude')
+
+
+class RestStopSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RestStop
+        fields = ('id', 'location', 'duration', 'reason', 'latitude',
+                  'longitude')
+
+
+class DailyPlanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyPlan
+        fields = ('date', 'driving_hours', 'on_duty_hours', 'off_duty_hours',
+                  'status', 'errors')
+
+
+class TripHistorySerializer(serializers.ModelSerializer):
+    """Trip with its stored segments and stops.
+
+    Expects a queryset from ``trip_history_queryset`` so the nested
+    relations are served from prefetch caches instead of per-row queries.
+    """
+    route_segments = RouteSegmentSerializer(many=True, read_only=True)
+    fuel_stops = FuelStopSerializer(many=True, read_only=True)
+    rest_stops = RestStopSerializer(many=True, read_only=True)
+    daily_plans = DailyPlanSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Trip
+        fields = ('id', 'origin', 'destination', 'pickup_location',
+                  'estimated_duration', 'total_distance_miles',
+                  'total_driving_hours', 'route_segments', 'fuel_stops',
+                  'rest_stops', 'daily_plans')
@@ -1,3 +1,488 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from eld.models import Driver
+
+from . import rate_limits
+from .models import (DailyPlan, FuelStop, RestStop, RouteSegment, Trip,
+                     UpstreamBucket)
+from .planner import _geolocator, plan_trip, save_plan_result
+from .routes import _client
+from .truck_stops import (FUEL, REST, RouteLine, TruckStopIndex, build_index,
+                          flat_miles, get_index)
+
+
+def create_trip(index):
+    trip = Trip.objects.create(
+        origin=f'Origin {index}', destination=f'Destination {index}',
+        pickup_location=f'Pickup {index}', estimated_duration=600)
+    RouteSegment.objects.create(
+        trip=trip, start_point='A', end_point='B', distance=120.5, driving_time=90)
+    RouteSegment.objects.create(
+        trip=trip, start_point='B', end_point='C', distance=300.0, driving_time=240)
+    FuelStop.objects.create(trip=trip, location='Fuel', fuel_amount=200)
+    RestStop.objects.create(trip=trip, location='Rest', duration=600, reason='10-hour break')
+    return trip
+
+
+class TripHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.trips = [create_trip(index) for index in range(30)]
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        # One query for the page of trips plus one per prefetched relation.
+        for page_size in (1, 5, 30):
+            with self.assertNumQueries(5):
+                response = self.client.get(
+                    reverse('trip-history'), {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_cursor_pages_walk_newest_first(self):
+        seen = []
+        url = reverse('trip-history') + '?page_size=12'
+        while url:
+            body = self.client.get(url).json()
+            seen.extend(trip['id'] for trip in body['results'])
+            url = body['next']
+        self.assertEqual(seen, sorted((trip.id for trip in self.trips), reverse=True))
+
+    def test_detail_includes_nested_relations(self):
+        trip = self.trips[0]
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('trip-detail', args=[trip.id]))
+        body = response.json()
+        self.assertEqual(body['origin'], 'Origin 0')
+        self.assertEqual([s['end_point'] for s in body['route_segments']], ['B', 'C'])
+        self.assertEqual(body['fuel_stops'][0]['fuel_amount'], 200)
+        self.assertEqual(body['rest_stops'][0]['reason'], '10-hour break')
+
+
+def fake_route(*legs):
+    """ORS-style GeoJSON response for legs of (meters, seconds)."""
+    return {'features': [{'properties': {'segments': [
+        {'distance': distance, 'duration': duration} for distance, duration in legs
+    ]}}]}
+
+
+class SavePlanResultTests(TestCase):
+    def setUp(self):
+        self.trip = self.new_trip()
+
+    def new_trip(self):
+        # Unsaved, the way PlanTripView plans it.
+        return Trip(
+            origin='New York, NY', pickup_location='Newark, NJ',
+            destination='Los Angeles, CA', estimated_duration=2520,
+            origin_lat=40.7, origin_long=-74.0, pickup_lat=40.7,
+            pickup_long=-74.2, dropoff_lat=34.0, dropoff_long=-118.2)
+
+    def plan(self, driving_hours):
+        route = fake_route((16000, 1200), (4500000, driving_hours * 3600 - 1200))
+        with mock.patch('trips.planner.get_route', return_value=route):
+            return plan_trip(None, self.trip)
+
+    def test_result_is_stored_as_rows(self):
+        result = self.plan(40)
+        save_plan_result(self.trip, result)
+
+        trip = Trip.objects.get(pk=self.trip.pk)
+        self.assertEqual(trip.total_driving_hours, 40)
+        self.assertEqual(trip.total_distance_miles, result['summary']['total_distance_miles'])
+        self.assertEqual(
+            list(trip.route_segments.values_list('start_point', 'end_point', 'distance')),
+            [('New York, NY', 'Newark, NJ', 16.0), ('Newark, NJ', 'Los Angeles, CA', 4500.0)])
+        self.assertEqual(trip.fuel_stops.count(), len(result['fuel_stops']))
+        self.assertEqual(trip.rest_stops.count(), len(result['plans']) - 1)
+        self.assertEqual(
+            [plan.driving_hours for plan in trip.daily_plans.all()],
+            [plan['driving_hours'] for plan in result['plans']])
+
+    def test_statement_count_does_not_grow_with_plan_length(self):
+        short, long = self.plan(25), self.plan(120)
+        self.assertGreater(len(long['plans']), len(short['plans']))
+        # Savepoint + trip insert + one insert per related table + release.
+        for result in (short, long):
+            trip = self.new_trip()
+            with self.assertNumQueries(7):
+                save_plan_result(trip, result)
+        self.assertEqual(DailyPlan.objects.filter(trip=trip).count(), len(long['plans']))
+
+    def test_plan_view_persists_and_returns_trip_id(self):
+        payload = {
+            'trip': {'origin': 'A', 'destination': 'C', 'pickup_location': 'B',
+                     'estimated_duration': 600, 'origin_lat': 1, 'origin_long': 1,
+                     'pickup_lat': 2, 'pickup_long': 2, 'dropoff_lat': 3, 'dropoff_long': 3},
+            'driver': {'name': 'Ann', 'license_number': 'L1', 'current_cycle_hours': 0},
+        }
+        route = fake_route((10000, 3600), (20000, 7200))
+        with mock.patch('trips.planner.get_route', return_value=route):
+            response = self.client.post(
+                reverse('plan-trip'), payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        detail = self.client.get(reverse('trip-detail', args=[response.json()['trip_id']])).json()
+        self.assertEqual(len(detail['route_segments']), 2)
+        self.assertEqual(len(detail['daily_plans']), 1)
+        self.assertEqual(detail['total_driving_hours'], 3)
+
+    def test_plan_view_saves_nothing_when_persisting_fails(self):
+        payload = {
+            'trip': {'origin': 'A', 'destination': 'C', 'pickup_location': 'B',
+                     'estimated_duration': 600, 'origin_lat': 1, 'origin_long': 1,
+                     'pickup_lat': 2, 'pickup_long': 2, 'dropoff_lat': 3, 'dropoff_long': 3},
+            'driver': {'name': 'Bob', 'license_number': 'L2', 'current_cycle_hours': 0},
+        }
+        route = fake_route((10000, 3600), (20000, 7200))
+        with mock.patch('trips.planner.get_route', return_value=route), \
+                mock.patch('trips.views.save_plan_result', side_effect=DatabaseError('disk full')):
+            response = self.client.post(
+                reverse('plan-trip'), payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'detail': 'Error saving the trip plan: disk full'})
+        self.assertFalse(Trip.objects.filter(origin='A').exists())
+        self.assertFalse(Driver.objects.filter(license_number='L2').exists())
+
+
+GEOCODES = {
+    'New York, NY': (40.71, -74.0),
+    'Newark, NJ': (40.73, -74.17),
+    'Los Angeles, CA': (34.05, -118.24),
+    'Chicago, IL': (41.88, -87.63),
+}
+
+
+def fake_geocoder(*args, **kwargs):
+    def geocode(address, timeout=None):
+        if address in GEOCODES:
+            lat, lng = GEOCODES[address]
+            return SimpleNamespace(latitude=lat, longitude=lng)
+        return None
+    return mock.Mock(geocode=mock.Mock(side_effect=geocode))
+
+
+# Rate limits high enough that tests which reach an upstream never wait.
+UNTHROTTLED = {name: {'rate': 1000, 'burst': 1000}
+               for name in ('nominatim', 'openrouteservice')}
+
+
+@override_settings(UPSTREAM_RATE_LIMITS=UNTHROTTLED)
+class WarmPlansCommandTests(TransactionTestCase):
+    def setUp(self):
+        caches['planning'].clear()
+        _geolocator.cache_clear()
+        _client.cache_clear()
+        self.addCleanup(_geolocator.cache_clear)
+        self.addCleanup(_client.cache_clear)
+        patches = [
+            mock.patch('geopy.geocoders.Nominatim', side_effect=fake_geocoder),
+            mock.patch('openrouteservice.Client'),
+        ]
+        _, client = [patch.start() for patch in patches]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+        self.directions = client.return_value.directions
+        self.directions.return_value = fake_route((16000, 1200), (4500000, 150000))
+
+    def warm(self, *args, concurrency=1):
+        out = StringIO()
+        # Default to one worker: concurrent writes to the in-memory SQLite
+        # test database can hit "table is locked", which the database cache
+        # treats as a miss. test_parallel_warm_up covers the parallel path.
+        call_command('warm_plans', f'--concurrency={concurrency}', *args, stdout=out)
+        return out.getvalue()
+
+    def lanes_file(self, lanes):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump(lanes, handle)
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def test_warms_file_lanes_then_planning_hits_cache(self):
+        path = self.lanes_file([
+            {'origin': 'New York, NY', 'pickup_location': 'Newark, NJ', 'destination': 'Los Angeles, CA'},
+            {'origin': 'Chicago, IL', 'pickup_location': 'Newark, NJ', 'destination': 'Los Angeles, CA'},
+        ])
+        output = self.warm('--file', path)
+
+        self.assertIn('Geocodes: 4 fetched, 0 already cached, 0 failed', output)
+        self.assertIn('Routes: 2 fetched, 0 already cached, 0 failed', output)
+        self.assertIn('All lanes warmed.', output)
+
+        geocode = _geolocator().geocode
+        geocode.reset_mock()
+        self.directions.reset_mock()
+        trip = Trip.objects.create(
+            origin='New York, NY', pickup_location='Newark, NJ',
+            destination='Los Angeles, CA', estimated_duration=600)
+        result = plan_trip(None, trip)
+        self.assertEqual(len(result['route_segments']), 2)
+        geocode.assert_not_called()
+        self.directions.assert_not_called()
+
+        self.assertIn('Routes: 0 fetched, 2 already cached', self.warm('--file', path))
+
+    def test_recent_trips_and_failures(self):
+        Trip.objects.create(origin='Nowhere', pickup_location='Newark, NJ',
+                            destination='Chicago, IL', estimated_duration=60)
+        output = self.warm('--recent', '5')
+        self.assertIn('Geocodes: 2 fetched, 0 already cached, 1 failed', output)
+        self.assertIn('Routes: 0 fetched, 0 already cached, 1 failed', output)
+
+        with self.assertRaises(CommandError):
+            self.warm('--recent', '5', '--strict')
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'planning': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                             'LOCATION': 'warm-plans-test'}},
+        UPSTREAM_RATE_LIMITS={})
+    def test_parallel_warm_up(self):
+        # An in-process cache and no rate-limit rows keep the workers off the
+        # shared test database, so the default concurrency can be exercised.
+        geocode = _geolocator().geocode
+        resolve = geocode.side_effect
+        lock = threading.Lock()
+        in_flight = []
+        peak = []
+
+        def slow_geocode(address, timeout=None):
+            with lock:
+                in_flight.append(address)
+                peak.append(len(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.remove(address)
+            return resolve(address, timeout)
+
+        geocode.side_effect = slow_geocode
+        path = self.lanes_file([
+            {'origin': origin, 'pickup_location': 'Newark, NJ', 'destination': destination}
+            for origin in ('New York, NY', 'Chicago, IL')
+            for destination in ('Los Angeles, CA', 'Chicago, IL')
+        ])
+        out = StringIO()
+        call_command('warm_plans', '--file', path, stdout=out)  # default concurrency
+
+        self.assertIn('Geocodes: 4 fetched, 0 already cached, 0 failed', out.getvalue())
+        self.assertIn('Routes: 4 fetched, 0 already cached, 0 failed', out.getvalue())
+        self.assertIn('Routes: 0 fetched, 4 already cached',
+                      self.warm('--file', path, concurrency=4))
+        self.assertEqual(geocode.call_count, 4)
+        self.assertEqual(self.directions.call_count, 4)
+        self.assertGreater(max(peak), 1)
+        self.assertLessEqual(max(peak), 4)
+
+
+@override_settings(UPSTREAM_RATE_LIMITS=UNTHROTTLED)
+class FakeUpstreamTests(TestCase):
+    """plan_trip against the benchmark stand-ins, over real HTTP."""
+
+    def setUp(self):
+        from benchmarks.upstreams import FakeUpstreams
+
+        caches['planning'].clear()
+        _geolocator.cache_clear()
+        _client.cache_clear()
+        self.addCleanup(_geolocator.cache_clear)
+        self.addCleanup(_client.cache_clear)
+        self.upstreams = self.enterContext(
+            FakeUpstreams(geocode_latency=0, route_latency=0, route_points=500))
+        overrides = self.settings(**self.upstreams.environ())
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_plan_trip_uses_configured_upstreams(self):
+        trip = Trip.objects.create(
+            origin='New York, NY', pickup_location='Chicago, IL',
+            destination='Los Angeles, CA', estimated_duration=2520)
+        result = plan_trip(None, trip)
+        self.assertNotIn('errors', result)
+        self.assertEqual(self.upstreams.requests, {'nominatim': 3, 'ors': 1})
+        self.assertGreater(result['summary']['total_distance_miles'], 0)
+        self.assertEqual(len(result['route_segments']), 2)
+
+        plan_trip(None, trip)
+        self.assertEqual(self.upstreams.requests, {'nominatim': 3, 'ors': 1})
+
+
+class TruckStopIndexTests(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.stops = [
+            (f'Stop {i}', rng.uniform(30, 47), rng.uniform(-122, -72),
+             rng.choice((FUEL, REST, FUEL | REST)))
+            for i in range(3000)
+        ]
+        self.index = TruckStopIndex(build_index(self.stops))
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(300):
+            lat, lng = rng.uniform(30, 47), rng.uniform(-122, -72)
+            kind = rng.choice((FUEL, REST))
+            candidates = [
+                (flat_miles(lat, lng, s_lat, s_lng), i)
+                for i, (_, s_lat, s_lng, s_kind) in enumerate(self.stops)
+                if s_kind & kind and flat_miles(lat, lng, s_lat, s_lng) <= 25
+            ]
+            found = self.index.nearest(lat, lng, 25, kind)
+            if not candidates:
+                self.assertIsNone(found)
+                continue
+            expected = min(candidates)
+            self.assertAlmostEqual(found[0], expected[0])
+            self.assertEqual(self.index.stop(found[1]).name,
+                             self.stops[expected[1]][0])
+
+    def test_along_route_steps_back_to_the_closest_earlier_stop(self):
+        index = TruckStopIndex(build_index([
+            ('Ahead', 40.0, -99.0, FUEL),
+            ('Behind', 40.02, -100.5, FUEL),
+            ('Rest only', 40.0, -100.0, REST),
+        ]))
+        line = RouteLine([[-105.0, 40.0], [-95.0, 40.0]])
+        target = line.length / 2  # -100.0
+        fuel, rest = (index.along_route(line, [target], kind, 10, 150)[0]
+                      for kind in (FUEL, REST))
+        self.assertEqual(fuel.name, 'Behind')
+        self.assertLess(fuel.distance_from_start, target)
+        self.assertLess(fuel.off_route_miles, 10)
+        self.assertEqual(rest.name, 'Rest only')
+        self.assertIsNone(index.along_route(line, [target], FUEL, 10, 5)[0])
+
+    def test_index_file_feeds_planned_stops(self):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        handle.write('name,latitude,longitude,kind,city,state\n'
+                     'Plains Fuel,40.01,-92.0,fuel,Kirksville,MO\n'
+                     'Prairie Rest,40.0,-92.5,truck_stop,,\n')
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        output = handle.name + '.idx'
+        self.addCleanup(lambda: os.path.exists(output) and os.unlink(output))
+        call_command('build_truck_stop_index', handle.name, '--output', output,
+                     stdout=StringIO())
+        self.addCleanup(get_index.cache_clear)
+
+        trip = Trip.objects.create(
+            origin='A', pickup_location='B', destination='C', estimated_duration=2520,
+            origin_lat=40.0, origin_long=-110.0, pickup_lat=40.0, pickup_long=-110.0,
+            dropoff_lat=40.0, dropoff_long=-80.0)
+        line = RouteLine([[-110.0, 40.0], [-80.0, 40.0]])
+        meters = line.length * 1609.34
+        route = fake_route((0, 0), (meters, 36 * 3600))
+        route['features'][0]['geometry'] = {'type': 'LineString',
+                                            'coordinates': line.coordinates}
+        with self.settings(TRUCK_STOP_INDEX=output), \
+                mock.patch('trips.planner.get_route', return_value=route):
+            result = plan_trip(None, trip)
+
+        fuel = result['fuel_stops'][0]
+        self.assertEqual(fuel['location'], 'Plains Fuel (Kirksville, MO)')
+        self.assertLessEqual(fuel['distance_from_start'], 1000)
+        # Days end near -100.8, -91.7 and -82.5; only the second has the
+        # rest stop within its search window, the others keep placeholders.
+        rest = [stop['location'] for stop in result['rest_stops']]
+        self.assertEqual(rest[1], 'Prairie Rest')
+        self.assertTrue(rest[0].startswith('End of day 1'))
+
+        save_plan_result(trip, result)
+        self.assertEqual(
+            list(trip.fuel_stops.values_list('location', 'latitude', 'longitude')),
+            [('Plains Fuel (Kirksville, MO)', 40.01, -92.0)])
+        self.assertEqual(trip.rest_stops.filter(latitude=40.0).count(), 1)
+
+
+class FakeClock:
+    def __init__(self, advance=True):
+        self.now = 1000.0
+        self.advance = advance
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        if self.advance:
+            self.now += seconds
+
+
+@override_settings(UPSTREAM_RATE_LIMITS={'nominatim': {'rate': 2, 'burst': 2}},
+                   UPSTREAM_MAX_WAIT_SECONDS=1.2)
+class RateLimitTests(TestCase):
+    def use_clock(self, **kwargs):
+        clock = FakeClock(**kwargs)
+        for patch in (mock.patch.object(rate_limits, 'time', clock),
+                      mock.patch.object(rate_limits, '_stats', rate_limits._Stats())):
+            patch.start()
+            self.addCleanup(patch.stop)
+        return clock
+
+    def test_interactive_calls_queue_then_fail_fast(self):
+        self.use_clock(advance=False)
+        waits = [rate_limits.acquire('nominatim') for _ in range(4)]
+        self.assertEqual(waits, [0, 0, 0.5, 1.0])
+        with self.assertRaises(rate_limits.UpstreamBusy) as busy:
+            rate_limits.acquire('nominatim')
+        self.assertEqual(busy.exception.retry_after, 1.5)
+
+        status = self.client.get(reverse('upstream-status')).json()['upstreams']
+        self.assertEqual(status[0]['name'], 'nominatim')
+        self.assertEqual(status[0]['queued'], 2)
+        self.assertEqual(status[0]['queue_seconds'], 1.0)
+        self.assertEqual(status[0]['process']['granted'], 4)
+        self.assertEqual(status[0]['process']['rejected'], 1)
+        self.assertEqual(status[0]['process']['waiting'], {'interactive': 0, 'batch': 0})
+
+    def test_batch_only_takes_capacity_left_by_interactive_calls(self):
+        clock = self.use_clock()
+        UpstreamBucket.objects.create(name='nominatim', tokens=-3, updated_at=clock.now)
+        # An interactive call still joins the queue ahead of batch traffic.
+        wait, _ = rate_limits._reserve('nominatim', 2, 2, rate_limits.INTERACTIVE, 10)
+        self.assertEqual(wait, 2.0)
+
+        with rate_limits.batch_priority():
+            waited = rate_limits.acquire('nominatim')
+        self.assertEqual(waited, 2.5)
+        self.assertEqual(UpstreamBucket.objects.get(name='nominatim').tokens, 0)
+
+    def test_backoff_holds_everyone_off(self):
+        self.use_clock(advance=False)
+        rate_limits.backoff('nominatim', 30)
+        with self.assertRaises(rate_limits.UpstreamBusy) as busy:
+            rate_limits.acquire('nominatim')
+        self.assertEqual(busy.exception.retry_after, 30)
+
+    def test_unconfigured_upstream_is_not_throttled(self):
+        self.use_clock(advance=False)
+        self.assertEqual(rate_limits.acquire('elsewhere'), 0)
+        self.assertFalse(UpstreamBucket.objects.exists())
+
+    def test_plan_view_returns_503_when_upstream_is_busy(self):
+        payload = {
+            'trip': {'origin': 'A', 'destination': 'C', 'pickup_location': 'B',
+                     'estimated_duration': 600},
+            'driver': {'name': 'Ann', 'license_number': 'L1', 'current_cycle_hours': 0},
+        }
+        with mock.patch('trips.views.plan_trip',
+                        side_effect=rate_limits.UpstreamBusy('nominatim', 3.2)):
+            response = self.client.post(
+                reverse('plan-trip'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '4')
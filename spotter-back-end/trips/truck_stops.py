@@ -0,0 +1,255 @@
+"""Truck stop and fuel station lookup along a route.
+
+Stops are loaded from a CSV into a grid-hash index file (see the
+``build_truck_stop_index`` command) laid out as flat arrays:
+
+    header | cell keys (q) | latitudes (d) | longitudes (d)
+           | cell starts (I) | name offsets (I) | kinds (B) | names (utf-8)
+
+Stops are sorted by grid cell, so a cell's stops are one contiguous range.
+The file is memory-mapped read-only and viewed in place with
+``memoryview.cast``; nothing is parsed at startup, and every worker on a
+host shares the same pages.
+
+A query only scans the cells within the search radius of a point (a 3x3
+block with the default sizes), so it touches a handful of stops no
+matter how many are indexed.
+"""
+import bisect
+import csv
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
+
+from django.conf import settings
+
+MAGIC = b'SPTSTOPS'
+# magic, version, byte order (always b'l'), cell size in degrees, cell count,
+# stop count, names length
+HEADER = struct.Struct('<8sBc6xdIII4x')
+FORMAT_VERSION = 1
+
+FUEL = 1
+REST = 2
+KINDS = {'fuel': FUEL, 'rest': REST, 'truck_stop': FUEL | REST}
+
+MILES_PER_DEGREE = 69.09
+# Cells span a column of 2**21 longitudes per latitude row.
+_ROW = 1 << 21
+
+TruckStop = namedtuple('TruckStop', 'name latitude longitude kind')
+RouteStop = namedtuple(
+    'RouteStop', 'name latitude longitude kind distance_from_start off_route_miles')
+
+
+def flat_miles(lat1, lng1, lat2, lng2):
+    """Equirectangular distance; accurate to well under 1% over the
+    tens of miles it is used for."""
+    x = (lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(x, lat2 - lat1) * MILES_PER_DEGREE
+
+
+def _cell(lat, lng, size):
+    return (math.floor((lat + 90) / size) * _ROW
+            + math.floor((lng + 180) / size))
+
+
+def read_csv(path):
+    """``(name, latitude, longitude, kind)`` rows from a CSV with ``name``,
+    ``latitude``, ``longitude`` and ``kind`` (fuel, rest or truck_stop)
+    columns, plus optional ``city`` and ``state`` appended to the name."""
+    with open(path, newline='') as handle:
+        for line, row in enumerate(csv.DictReader(handle), start=2):
+            try:
+                kind = KINDS[row['kind'].strip().lower()]
+                latitude, longitude = float(row['latitude']), float(row['longitude'])
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{path}:{line}: invalid stop row ({e})") from e
+            place = ', '.join(part for part in (row.get('city'), row.get('state')) if part)
+            name = row['name'].strip()
+            yield (f"{name} ({place})" if place else name), latitude, longitude, kind
+
+
+def build_index(stops, cell_degrees=0.5):
+    """Serialize ``(name, latitude, longitude, kind)`` rows to index bytes."""
+    stops = sorted(
+        ((_cell(lat, lng, cell_degrees), name, lat, lng, kind)
+         for name, lat, lng, kind in stops),
+        key=lambda stop: stop[0])
+
+    keys, starts = [], []
+    for index, (key, *_) in enumerate(stops):
+        if not keys or keys[-1] != key:
+            keys.append(key)
+            starts.append(index)
+    starts.append(len(stops))
+
+    names = [stop[1].encode() for stop in stops]
+    name_offsets = [0, *accumulate(len(name) for name in names)]
+    sections = [
+        array('q', keys),
+        array('d', [stop[2] for stop in stops]),
+        array('d', [stop[3] for stop in stops]),
+        array('I', starts),
+        array('I', name_offsets),
+        array('B', [stop[4] for stop in stops]),
+    ]
+    if sys.byteorder == 'big':
+        for section in sections:
+            section.byteswap()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, b'l', cell_degrees,
+                         len(keys), len(stops), name_offsets[-1])
+    return header + b''.join(s.tobytes() for s in sections) + b''.join(names)
+
+
+class TruckStopIndex:
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, version, byteorder, self.cell_degrees, cells, count, _ = \
+            HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a truck stop index (or an incompatible version); rebuild it.")
+        if byteorder != b'l' or sys.byteorder != 'little':
+            raise ValueError("Truck stop indexes are little-endian; rebuild on this host.")
+        self._buffer = buffer
+        self._count = count
+
+        offset = HEADER.size
+
+        def take(code, length):
+            nonlocal offset
+            size = struct.calcsize(code) * length
+            section = view[offset:offset + size].cast(code)
+            offset += size
+            return section
+
+        self._keys = take('q', cells)
+        self._lats = take('d', count)
+        self._lngs = take('d', count)
+        self._starts = take('I', cells + 1)
+        self._name_offsets = take('I', count + 1)
+        self._kinds = take('B', count)
+        self._names = view[offset:]
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as handle:
+            return cls(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self._count
+
+    def stop(self, index):
+        name = bytes(self._names[self._name_offsets[index]:self._name_offsets[index + 1]])
+        return TruckStop(name.decode(), self._lats[index], self._lngs[index],
+                         self._kinds[index])
+
+    def _cell_range(self, key):
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            return range(self._starts[position], self._starts[position + 1])
+        return range(0)
+
+    def nearest(self, lat, lng, radius_miles, kind=FUEL | REST):
+        """``(miles, index)`` of the closest stop of ``kind`` within
+        ``radius_miles`` of a point, or ``None``."""
+        size = self.cell_degrees
+        # Longitude degrees shrink with latitude; widen the block to match.
+        reach_lat = math.ceil(radius_miles / MILES_PER_DEGREE / size)
+        reach_lng = math.ceil(radius_miles / (MILES_PER_DEGREE * max(
+            0.01, math.cos(math.radians(min(89.0, abs(lat) + reach_lat * size))))) / size)
+        center = _cell(lat, lng, size)
+        best = None
+        for row in range(-reach_lat, reach_lat + 1):
+            for column in range(-reach_lng, reach_lng + 1):
+                for index in self._cell_range(center + row * _ROW + column):
+                    if not self._kinds[index] & kind:
+                        continue
+                    miles = flat_miles(lat, lng, self._lats[index], self._lngs[index])
+                    if miles <= radius_miles and (best is None or miles < best[0]):
+                        best = (miles, index)
+        return best
+
+    def along_route(self, line, distances, kind, corridor_miles, search_back_miles):
+        """The stop for each target distance (miles from the start of
+        ``line``), or ``None`` where there is none.
+
+        Looks for the closest stop within ``corridor_miles`` of the route at
+        the target, then steps back along the route (never forward, since a
+        fuel or rest stop is due by then) up to ``search_back_miles``.
+        """
+        step = max(1.0, corridor_miles)
+        found = []
+        for target in distances:
+            target = min(target, line.length)
+            match = None
+            back = 0.0
+            while match is None and back <= search_back_miles:
+                lat, lng = line.point_at(target - back)
+                hit = self.nearest(lat, lng, corridor_miles, kind)
+                if hit:
+                    stop = self.stop(hit[1])
+                    match = RouteStop(*stop, distance_from_start=round(target - back, 1),
+                                      off_route_miles=round(hit[0], 1))
+                back += step
+            found.append(match)
+        return found
+
+
+class RouteLine:
+    """A GeoJSON LineString (``[lng, lat]`` pairs) measured in miles."""
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+        self.cumulative = [0.0, *accumulate(
+            flat_miles(a[1], a[0], b[1], b[0])
+            for a, b in zip(coordinates, coordinates[1:]))]
+        self.length = self.cumulative[-1]
+
+    def point_at(self, miles):
+        """``(lat, lng)`` at ``miles`` from the start, clamped to the line."""
+        miles = min(max(miles, 0.0), self.length)
+        index = max(1, bisect.bisect_left(self.cumulative, miles))
+        if index >= len(self.coordinates):
+            lng, lat = self.coordinates[-1][:2]
+            return lat, lng
+        start, end = self.cumulative[index - 1], self.cumulative[index]
+        t = (miles - start) / (end - start) if end > start else 0.0
+        (lng1, lat1), (lng2, lat2) = self.coordinates[index - 1][:2], self.coordinates[index][:2]
+        return lat1 + (lat2 - lat1) * t, lng1 + (lng2 - lng1) * t
+
+
+@lru_cache(maxsize=None)
+def get_index():
+    """The configured index, or ``None`` when no index file exists."""
+    try:
+        return TruckStopIndex.open(settings.TRUCK_STOP_INDEX)
+    except FileNotFoundError:
+        return None
+
+
+def stops_along_route(coordinates, distances, kind, total_distance_miles=None):
+    """Look up stops for target ``distances`` along a route geometry.
+
+    ``distances`` are in the units of ``total_distance_miles`` (the routed
+    distance) and are rescaled onto the geometry's own length. Returns a
+    list aligned with ``distances`` (``None`` entries for misses), or
+    ``None`` when no index is available.
+    """
+    index = get_index()
+    if index is None or not coordinates or len(coordinates) < 2 or not distances:
+        return None
+    line = RouteLine(coordinates)
+    scale = line.length / total_distance_miles if total_distance_miles else 1.0
+    found = index.along_route(
+        line, [distance * scale for distance in distances], kind,
+        settings.TRUCK_STOP_CORRIDOR_MILES, settings.TRUCK_STOP_SEARCH_BACK_MILES)
+    return [
+        stop and stop._replace(distance_from_start=round(stop.distance_from_start / scale, 1))
+        for stop in found
+    ]
@@ -1,9 +1,13 @@
 from django.urls import path
 
-from .views import DriverCycleView, PlanTripView
+from .views import (DriverCycleView, PlanTripView, TripDetailView,
+                    TripHistoryView, UpstreamStatusView)
 
 urlpatterns = [
+    path('', TripHistoryView.as_view(), name='trip-history'),
+    path('<int:pk>/', TripDetailView.as_view(), name='trip-detail'),
     path('plan/', PlanTripView.as_view(), name='plan-trip'),
     path('drivers/<int:driver_id>/cycle/',
          DriverCycleView.as_view(), name='driver-cycle'),
+    path('upstreams/', UpstreamStatusView.as_view(), name='upstream-status'),
 ]
@@ -1,12 +1,52 @@
+import math
 
+from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from eld.models import Driver
-from rest_framework import status
+from rest_framework import generics, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .planner import plan_trip
-from .serializers import DriverSerializer, TripSerializer
+from .models import DailyPlan, FuelStop, RestStop, RouteSegment, Trip
+from .planner import plan_trip, save_plan_result
+from .rate_limits import UpstreamBusy, upstream_status
+from .serializers import (DriverSerializer, TripHistorySerializer,
+                          TripSerializer)
+
+
+def trip_history_queryset():
+    """Trips with only the serialized columns and their relations prefetched.
+
+    Every page costs one query for trips plus one per relation, no matter
+    how many trips it holds.
+    """
+    return Trip.objects.only(
+        'id', 'origin', 'destination', 'pickup_location', 'estimated_duration',
+        'total_distance_miles', 'total_driving_hours',
+    ).prefetch_related(
+        Prefetch('route_segments', queryset=RouteSegment.objects.only(
+            'id', 'trip_id', 'start_point', 'end_point', 'distance',
+            'driving_time').order_by('id')),
+        Prefetch('fuel_stops', queryset=FuelStop.objects.only(
+            'id', 'trip_id', 'location', 'fuel_amount', 'latitude',
+            'longitude').order_by('id')),
+        Prefetch('rest_stops', queryset=RestStop.objects.only(
+            'id', 'trip_id', 'location', 'duration', 'reason', 'latitude',
+            'longitude').order_by('id')),
+        Prefetch('daily_plans', queryset=DailyPlan.objects.only(
+            'id', 'trip_id', 'date', 'driving_hours', 'on_duty_hours',
+            'off_duty_hours', 'status', 'errors')),
+    )
+
+
+class TripHistoryPagination(CursorPagination):
+    # Cursor pagination keeps deep pages as cheap as the first one (no OFFSET).
+    ordering = '-id'
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
 
 
 class PlanTripView(APIView):
@@ -24,11 +64,16 @@ class PlanTripView(APIView):
         if not driver_serializer.is_valid():
             return Response({'driver_errors': driver_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        trip = trip_serializer.save()
-        driver = driver_serializer.save()
+        # Planning only reads the submitted fields; rows are written together
+        # once the plan is known to be good.
+        trip = Trip(**trip_serializer.validated_data)
+        driver = Driver(**driver_serializer.validated_data)
 
         try:
             result = plan_trip(driver, trip)
+        except UpstreamBusy as e:
+            return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={'Retry-After': str(math.ceil(e.retry_after))})
         except Exception as e:
             return Response({'detail': f'Error during trip planning: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -40,6 +85,13 @@ class PlanTripView(APIView):
         if planning_errors:
             return Response({'detail': 'HOS or planning errors found.', 'planning_errors': planning_errors, 'result': result}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            with transaction.atomic():
+                driver.save()
+                save_plan_result(trip, result)
+        except Exception as e:
+            return Response({'detail': f'Error saving the trip plan: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        result['trip_id'] = trip.id
         return Response(result, status=status.HTTP_200_OK)
 
 
@@ -49,3 +101,23 @@ class DriverCycleView(APIView):
         used = driver.current_cycle_hours
         remaining = max(0, 70 * 60 - used)
         return Response({'driver_id': driver.id, 'used_minutes': used, 'remaining_minutes': remaining})
+
+
+class UpstreamStatusView(APIView):
+    def get(self, request):
+        return Response({'upstreams': upstream_status()})
+
+
+class TripHistoryView(generics.ListAPIView):
+    serializer_class = TripHistorySerializer
+    pagination_class = TripHistoryPagination
+
+    def get_queryset(self):
+        return trip_history_queryset()
+
+
+class TripDetailView(generics.RetrieveAPIView):
+    serializer_class = TripHistorySerializer
+
+    def get_queryset(self):
+        return trip_history_queryset()